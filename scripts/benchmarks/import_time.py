@@ -0,0 +1,45 @@
+""" Measure the time to import crosscosmos (and to import the corpus module) in a fresh interpreter
+
+Each measurement is the best of several runs in a new process, and is checked against a time budget.
+"""
+
+# Standard library
+import subprocess
+import sys
+
+N_RUNS = 5
+
+# Budgets in milliseconds
+IMPORT_BUDGETS = {
+    "import crosscosmos": 150,
+    "import crosscosmos.corpus": 400,
+    "import crosscosmos.solver": 400,
+}
+
+TIMING_SNIPPET = """
+import time
+t = time.perf_counter()
+{statement}
+print((time.perf_counter() - t) * 1e3)
+"""
+
+
+def time_statement(statement: str, n_runs: int = N_RUNS) -> float:
+    times = []
+    for _ in range(n_runs):
+        out = subprocess.run([sys.executable, "-c", TIMING_SNIPPET.format(statement=statement)],
+                             capture_output=True, text=True, check=True)
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return min(times)
+
+
+if __name__ == "__main__":
+    over_budget = []
+    for statement, budget in IMPORT_BUDGETS.items():
+        ms = time_statement(statement)
+        print(f"{statement:<32} {ms:8.1f} ms  (budget {budget} ms)")
+        if ms > budget:
+            over_budget.append(statement)
+
+    if over_budget:
+        sys.exit(f"Over budget: {', '.join(over_budget)}")
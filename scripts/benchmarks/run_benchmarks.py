@@ -0,0 +1,252 @@
+""" Benchmark corpus loading, pattern queries, grid edits, grid save/load and fills against a stored baseline
+
+Everything random (query patterns, black squares, solver value ordering) is drawn from fixed seeds, so two runs on the
+same machine do the same work. Timings are the best of several repeats. Fills are run through bot.solve in every
+SolveMode, and also record the number of search nodes (iterations of the letter-by-letter solver), which does not
+depend on the machine (except for SolveMode.PARALLEL, which races several processes and records none).
+
+A result only counts as a regression if it is both more than the tolerance slower (as a fraction of the baseline) and
+at least MIN_REGRESSION_SECONDS slower, so that sub-millisecond timer noise is not flagged.
+
+The corpus is built from the word list shipped in resources/word_lists, so no word database is needed.
+
+Usage:
+    python run_benchmarks.py                      # Run, write results.json, compare against baseline.json
+    python run_benchmarks.py --save-baseline      # Run and store the results as the new baseline
+"""
+
+# Standard library
+import argparse
+import csv
+import json
+from pathlib import Path
+import platform
+import random
+import sys
+import tempfile
+import time
+
+# Third-party
+import numpy as np
+
+# CrossCosmos
+import crosscosmos as xc
+from crosscosmos import bot
+from crosscosmos.bot import SolveMode
+from crosscosmos.corpus import Corpus
+from crosscosmos.grid import CellStatus, Grid, GridStatus
+from crosscosmos.stats import SolveStats
+from crosscosmos.word_index import WordIndex
+
+SEED = 20240101
+N_REPEATS = 5
+
+BENCHMARK_DIR = Path(__file__).parent
+DEFAULT_BASELINE = BENCHMARK_DIR / "baseline.json"
+DEFAULT_RESULTS = BENCHMARK_DIR / "results.json"
+WORD_LIST = xc.crosscosmos_project_root / "resources" / "word_lists" / "broda_trimmed_by_diehl_2020.csv"
+
+FILL_GRIDS = ["test_grid_55.json", "test_grid_66.json", "test_grid_88.json", "test_grid_nyt_normal_test.json"]
+FILL_MAX_TIME = 10
+
+N_PATTERNS = 200
+PATTERN_LENGTHS = range(3, 16)
+PATTERN_KEEP_FRACTIONS = (0.2, 0.4, 0.6)
+
+EDIT_GRID_SIZES = [(15, 15), (21, 21)]
+EDIT_BLACK_FRACTION = 0.16
+N_EDITS = 200
+
+# A result is flagged if it is this much slower (as a fraction of the baseline), and by at least this many seconds
+DEFAULT_TOLERANCE = 0.25
+MIN_REGRESSION_SECONDS = 0.002
+
+
+def best_time(fn, n_repeats: int = N_REPEATS) -> float:
+    times = []
+    for _ in range(n_repeats):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return min(times)
+
+
+def read_word_list(path: Path):
+    words = []
+    scores = []
+    with open(path, newline="") as f:
+        for word, word_score in csv.reader(f, delimiter=";"):
+            words.append(word)
+            scores.append(int(word_score))
+    return words, scores
+
+
+def bench_corpus(results: dict, compiled_path: Path) -> Corpus:
+    """ Time building the word index from the shipped list, and loading it back from a compiled file
+    """
+    words, scores = read_word_list(WORD_LIST)
+    results["corpus.read_word_list"] = dict(seconds=best_time(lambda: read_word_list(WORD_LIST), 3))
+    results["corpus.build_index"] = dict(seconds=best_time(lambda: WordIndex.from_words(words, scores), 3))
+
+    WordIndex.from_words(words, scores).save(compiled_path, metadata=dict(source=WORD_LIST.name))
+    results["corpus.load_compiled"] = dict(seconds=best_time(lambda: Corpus.from_compiled(compiled_path)))
+
+    return Corpus.from_compiled(compiled_path)
+
+
+def make_patterns(corpus: Corpus, rng: np.random.Generator):
+    """ Patterns made by blanking out letters of random corpus words, so that most of them have matches
+    """
+    patterns = []
+    for _ in range(N_PATTERNS):
+        bucket = corpus.index[int(rng.choice(PATTERN_LENGTHS))]
+        word = bucket.words[int(rng.integers(len(bucket)))]
+        keep = rng.random(len(word)) < rng.choice(PATTERN_KEEP_FRACTIONS)
+        patterns.append("".join(c if k else "-" for c, k in zip(word, keep)))
+    return patterns
+
+
+def bench_queries(results: dict, corpus: Corpus, rng: np.random.Generator):
+    patterns = make_patterns(corpus, rng)
+    letters = [[(i, c) for i, c in enumerate(p) if c != "-"] for p in patterns]
+    corpus.query(patterns[0])  # Build the bitsets outside the timed loop
+
+    n_matches = sum(len(corpus.query(p)) for p in patterns)
+    results["corpus.query"] = dict(seconds=best_time(lambda: [corpus.query(p) for p in patterns]) / len(patterns),
+                                   n_patterns=len(patterns), n_matches=n_matches)
+    results["corpus.match"] = dict(seconds=best_time(lambda: [corpus.match(len(p), lw)
+                                                              for p, lw in zip(patterns, letters)]) / len(patterns),
+                                   n_patterns=len(patterns))
+
+
+def random_black_grid(grid_size, rng: np.random.Generator) -> Grid:
+    grid = Grid(grid_size)
+    n_black = int(EDIT_BLACK_FRACTION * grid_size[0] * grid_size[1] / 2)
+    for flat in rng.choice(grid_size[0] * grid_size[1], n_black, replace=False):
+        grid.set_grid(*divmod(int(flat), grid_size[1]), None)
+    return grid
+
+
+def bench_grid_edits(results: dict, rng: np.random.Generator):
+    for grid_size in EDIT_GRID_SIZES:
+        name = f"{grid_size[0]}x{grid_size[1]}"
+        grid = random_black_grid(grid_size, rng)
+        results[f"grid.update_length_and_head_data.{name}"] = dict(
+            seconds=best_time(lambda: [grid.update_length_and_head_data() for _ in range(N_EDITS)]) / N_EDITS)
+
+        # Toggle random squares black and back (each toggle updates the heads)
+        cells = [divmod(int(flat), grid_size[1]) for flat in rng.choice(grid_size[0] * grid_size[1], N_EDITS)]
+
+        def toggle():
+            for i, j in cells:
+                was_black = grid[i, j].status == CellStatus.BLACK
+                grid.set_grid(i, j, "" if was_black else None)
+                grid.set_grid(i, j, None if was_black else "")
+
+        results[f"grid.toggle_black.{name}"] = dict(seconds=best_time(toggle) / (2 * N_EDITS))
+
+
+def bench_grid_io(results: dict, tmp_dir: Path, rng: np.random.Generator):
+    """ Time saving and loading a 21x21 grid in the compact format
+    """
+    grid = random_black_grid(EDIT_GRID_SIZES[-1], rng)
+    path = tmp_dir / "grid.json"
+    results["grid.save"] = dict(seconds=best_time(lambda: [grid.save(path) for _ in range(N_EDITS)]) / N_EDITS)
+    results["grid.load"] = dict(seconds=best_time(lambda: [Grid.load(path) for _ in range(N_EDITS)]) / N_EDITS)
+
+
+def bench_fills(results: dict, corpus: Corpus):
+    for mode in SolveMode:
+        for grid_file in FILL_GRIDS:
+            grid = Grid.load(xc.crosscosmos_project_root / grid_file)
+            grid.corpus = corpus
+            if mode == SolveMode.LETTER:
+                grid.build_tries()
+            stats = None if mode == SolveMode.PARALLEL else SolveStats()
+            random.seed(SEED)  # Cell queue order of the letter-by-letter solver
+
+            t = time.perf_counter()
+            status = bot.solve(grid, FILL_MAX_TIME, mode=mode, stats=stats, seed=SEED)
+            seconds = time.perf_counter() - t
+
+            nodes = backtracks = None
+            if stats:
+                nodes = stats.counters["iterations" if mode == SolveMode.LETTER else "nodes"]
+                backtracks = stats.counters["backtracks"]
+            results[f"fill.{mode.name.lower()}.{Path(grid_file).stem}"] = dict(seconds=seconds,
+                                                                             status=status.name,
+                                                                             complete=status == GridStatus.COMPLETE,
+                                                                             nodes=nodes,
+                                                                             backtracks=backtracks)
+
+
+def run() -> dict:
+    results = {}
+    rng = np.random.default_rng(SEED)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus = bench_corpus(results, Path(tmp_dir) / "corpus.xcidx")
+        bench_queries(results, corpus, rng)
+        bench_grid_edits(results, rng)
+        bench_grid_io(results, Path(tmp_dir), rng)
+        bench_fills(results, corpus)
+
+    return dict(
+        meta=dict(
+            seed=SEED,
+            python=platform.python_version(),
+            numpy=np.__version__,
+            machine=platform.machine(),
+            processor=platform.processor(),
+            time=time.strftime("%Y-%m-%dT%H:%M:%S"),
+        ),
+        results=results,
+    )
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """ Print each result next to its baseline, and return the names of those that regressed
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<44} {result['seconds'] * 1e3:10.3f} ms  (new)")
+            continue
+
+        ratio = result["seconds"] / base["seconds"] if base["seconds"] else float("inf")
+        flags = []
+        if ratio > 1 + tolerance and result["seconds"] - base["seconds"] > MIN_REGRESSION_SECONDS:
+            flags.append("SLOWER")
+        if base.get("complete") and not result.get("complete"):
+            flags.append("NO LONGER COMPLETES")
+        if base.get("complete") and result.get("complete") and result["nodes"] != base["nodes"]:
+            flags.append(f"nodes {base['nodes']} -> {result.get('nodes')}")
+
+        print(f"{name:<44} {result['seconds'] * 1e3:10.3f} ms  "
+              f"(baseline {base['seconds'] * 1e3:10.3f} ms, x{ratio:5.2f}) {' '.join(flags)}")
+        if "SLOWER" in flags or "NO LONGER COMPLETES" in flags:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--output", type=Path, default=DEFAULT_RESULTS)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    args = parser.parse_args()
+
+    current = run()
+    xc.io_utils.save_json_dict(args.output, current)
+
+    if args.save_baseline:
+        xc.io_utils.save_json_dict(args.baseline, current)
+        print(f"Saved baseline to {args.baseline}")
+    elif args.baseline.exists():
+        regressed = compare(current, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressed:
+            sys.exit(f"Regressed: {', '.join(regressed)}")
+    else:
+        print(json.dumps(current["results"], indent=2))
+        print(f"No baseline at {args.baseline} (create one with --save-baseline)")
@@ -0,0 +1,59 @@
+""" Shared fixtures for the solver tests
+
+The corpus is compiled from the word list shipped in resources/word_lists (as in scripts/benchmarks), so no word
+database is needed. Run from the repository root, with the package on the path:
+
+    PYTHONPATH=src python -m pytest scripts/bot_tests
+"""
+
+# Standard library
+import csv
+import random
+
+# Third-party
+import pytest
+
+# CrossCosmos
+import crosscosmos as xc
+from crosscosmos.corpus import Corpus
+from crosscosmos.grid import Grid
+from crosscosmos.word_index import WordIndex
+
+WORD_LIST = xc.crosscosmos_project_root / "resources" / "word_lists" / "broda_trimmed_by_diehl_2020.csv"
+SEED = 20240101
+
+# Scripts run at import against a word database, rather than tests
+collect_ignore = ["test_tree_reduce.py"]
+
+
+@pytest.fixture(scope="session")
+def compiled_path(tmp_path_factory):
+    words = []
+    scores = []
+    with open(WORD_LIST, newline="") as f:
+        for word, word_score in csv.reader(f, delimiter=";"):
+            words.append(word)
+            scores.append(int(word_score))
+
+    path = tmp_path_factory.mktemp("corpus") / "diehl.xcidx"
+    WordIndex.from_words(words, scores).save(path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def corpus(compiled_path) -> Corpus:
+    return Corpus.from_compiled(compiled_path)
+
+
+@pytest.fixture
+def load_grid(corpus):
+    """ Load one of the grids shipped at the project root, with the corpus (and its tries) attached
+    """
+    def load(grid_file: str) -> Grid:
+        random.seed(SEED)  # Cell queue order of the letter-by-letter solver
+        grid = Grid.load(xc.crosscosmos_project_root / grid_file)
+        grid.corpus = corpus
+        grid.build_tries()
+        return grid
+
+    return load
@@ -0,0 +1,61 @@
+""" Array tries and the per-fill used words layered over them
+"""
+
+# Third-party
+import numpy as np
+
+# CrossCosmos
+from crosscosmos.array_trie import NO_NODE, ArrayTrie, UsedWords
+
+WORDS = ["CAT", "CAR", "COT", "DOG", "CAT"]
+
+
+def test_from_words():
+    trie = ArrayTrie.from_words(3, WORDS)
+    assert len(trie) == 4  # Duplicates are dropped
+    assert "CAT" in trie and "cot" in trie
+    assert "CA" not in trie and "DOT" not in trie and "CATS" not in trie
+    assert trie.counts[trie.find("C")] == 3
+    assert trie.counts[trie.find("CA")] == 2
+    assert trie.find("X") == NO_NODE
+    assert trie.step(trie.find("DO"), ord("G") - 65) == trie.find("DOG")
+    assert trie.parents[trie.find("DOG")] == trie.find("DO")
+
+
+def test_save_load_round_trip(tmp_path):
+    trie = ArrayTrie.from_words(3, WORDS)
+    assert not ArrayTrie.exists(tmp_path, 3)
+    trie.save(tmp_path)
+    assert ArrayTrie.exists(tmp_path, 3)
+
+    loaded = ArrayTrie.load(tmp_path, 3)
+    for name in ("children", "parents", "counts"):
+        assert np.array_equal(getattr(loaded, name), getattr(trie, name))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["children_3.npy", "counts_3.npy", "parents_3.npy"]
+
+
+def test_used_words():
+    trie = ArrayTrie.from_words(3, WORDS)
+    used = UsedWords()
+    cat, car = trie.find("CAT"), trie.find("CAR")
+
+    used.add(trie, cat)
+    used.add(trie, cat)  # No-op
+    assert len(used) == 1
+    assert not used.is_available(trie, cat)
+    assert used.is_available(trie, car)
+    assert used.is_available(trie, trie.find("CA"))
+
+    used.add(trie, car)
+    assert not used.is_available(trie, trie.find("CA"))
+    assert used.is_available(trie, trie.find("C"))  # COT is left
+
+    used.discard(trie, cat)
+    used.discard(trie, cat)  # No-op
+    assert used.is_available(trie, cat)
+    assert used.is_available(trie, trie.find("CA"))
+    assert len(used) == 1
+
+    # The trie itself is never modified
+    assert trie.counts[trie.find("CA")] == 2
+    assert not used.is_available(trie, NO_NODE)
@@ -0,0 +1,96 @@
+""" Binding the word databases
+"""
+
+# Standard library
+import sqlite3
+
+# Third-party
+from pony import orm
+import pytest
+
+# CrossCosmos
+from crosscosmos.data_models import WRITE_PRAGMAS, bind_database
+
+
+def make_db() -> orm.Database:
+    db = orm.Database()
+
+    class Word(db.Entity):
+        word = orm.Required(str)
+        length = orm.Required(int)
+
+    return db
+
+
+def journal_mode(db_path) -> str:
+    connection = sqlite3.connect(db_path)
+    try:
+        return connection.execute("PRAGMA journal_mode").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def test_read_binding_leaves_journal_mode(tmp_path):
+    db_path = tmp_path / "words.sqlite"
+    db = bind_database(make_db(), db_path)
+    with orm.db_session:
+        assert db.Word.select().count() == 0
+    db.disconnect()
+
+    assert journal_mode(db_path) == "delete"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["words.sqlite"]
+
+
+def test_write_binding_uses_wal(tmp_path):
+    db_path = tmp_path / "words.sqlite"
+    db = bind_database(make_db(), db_path, pragmas=WRITE_PRAGMAS)
+    with orm.db_session:
+        db.Word(word="ABC", length=3)
+    db.disconnect()
+
+    assert journal_mode(db_path) == "wal"
+
+
+def make_clue_db(with_key: bool) -> orm.Database:
+    db = orm.Database()
+
+    class Word(db.Entity):
+        word = orm.PrimaryKey(str)
+        clues = orm.Set("Clue")
+
+    class Clue(db.Entity):
+        clue = orm.Required(str)
+        word = orm.Required(Word)
+        if with_key:
+            orm.composite_key(word, clue)
+
+    return db
+
+
+def test_binding_removes_duplicate_keys(tmp_path):
+    # A database from before the (word, clue) key was declared
+    db_path = tmp_path / "clues.sqlite"
+    db = bind_database(make_clue_db(with_key=False), db_path)
+    with orm.db_session:
+        word = db.Word(word="ERA")
+        for clue in ["Age", "Age", "Epoch", "Age"]:
+            db.Clue(word=word, clue=clue)
+    db.disconnect()
+
+    db = bind_database(make_clue_db(with_key=True), db_path)
+    with orm.db_session:
+        assert sorted((c.id, c.clue) for c in db.Clue.select()) == [(1, "Age"), (3, "Epoch")]
+    db.disconnect()
+
+    connection = sqlite3.connect(db_path)
+    try:
+        with pytest.raises(sqlite3.IntegrityError):
+            connection.execute("INSERT INTO Clue (clue, word) VALUES ('Age', 'ERA')")
+    finally:
+        connection.close()
+
+    # Once the unique index exists, the check is skipped
+    db = bind_database(make_clue_db(with_key=True), db_path)
+    with orm.db_session:
+        assert db.Clue.select().count() == 2
+    db.disconnect()
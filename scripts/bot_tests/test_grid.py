@@ -0,0 +1,71 @@
+""" Grid editing and storage
+"""
+
+# Third-party
+import numpy as np
+import pytest
+
+# CrossCosmos
+import crosscosmos as xc
+from crosscosmos.grid import GRID_FORMAT, GRID_FORMAT_VERSION, CellStatus, Grid
+
+
+@pytest.mark.parametrize("value", ["ß", "é", "AB", "1", "#", "?", ".", 7])
+def test_cell_update_rejects_invalid_letters(value):
+    grid = Grid((3, 3))
+    with pytest.raises(ValueError):
+        grid[0, 0].update(value)
+    assert grid[0, 0].status == CellStatus.EMPTY
+
+
+def test_cell_update_uppercases():
+    grid = Grid((3, 3))
+    grid[0, 0].update("q")
+    assert grid[0, 0].value == "Q"
+    assert grid[0, 0].status == CellStatus.SET
+    assert grid.letters[0, 0] == ord("Q")
+
+
+def test_black_validity_follows_auto_symmetry():
+    grid = Grid((5, 5))
+    grid.set_grid(4, 0, None)
+    assert grid.is_valid_with_black(3, 0)
+
+    # Its symmetric partner (1, 4) would now be set black too, leaving a 1-letter word in column 4
+    grid.auto_symmetry = True
+    assert not grid.is_valid_with_black(3, 0)
+    grid.auto_symmetry = False
+    assert grid.is_valid_with_black(3, 0)
+
+
+def assert_same_grid(grid, other):
+    assert tuple(other.grid_size) == tuple(grid.grid_size)
+    assert other.symmetry == grid.symmetry
+    assert other.auto_symmetry == grid.auto_symmetry
+    for name in ("statuses", "letters", "hlens", "vlens", "answer_numbers", "h_starts", "v_starts"):
+        assert np.array_equal(getattr(other, name), getattr(grid, name)), name
+
+
+@pytest.mark.parametrize("grid_file", ["test_grid_55.json", "test_grid_88.json", "test_grid_nyt_normal_test.json"])
+def test_compact_round_trip(tmp_path, grid_file):
+    grid = Grid.load(xc.crosscosmos_project_root / grid_file)
+    grid.auto_symmetry = not grid.auto_symmetry
+    open_cells = np.argwhere(np.isin(grid.statuses, [CellStatus.EMPTY.value, CellStatus.SET.value]))
+    grid[tuple(open_cells[0])].update("x")
+
+    compact = grid.to_compact()
+    assert compact["format"] == GRID_FORMAT and compact["version"] == GRID_FORMAT_VERSION
+    assert_same_grid(grid, Grid.from_dict(compact))
+
+    grid.save(tmp_path / "compact.json")
+    grid.save(tmp_path / "verbose.json", verbose=True)
+    assert_same_grid(grid, Grid.load(tmp_path / "compact.json"))
+    assert_same_grid(grid, Grid.load(tmp_path / "verbose.json"))
+    assert (tmp_path / "compact.json").stat().st_size < (tmp_path / "verbose.json").stat().st_size
+
+
+def test_compact_rejects_newer_versions():
+    compact = Grid((3, 3)).to_compact()
+    compact["version"] = GRID_FORMAT_VERSION + 1
+    with pytest.raises(ValueError):
+        Grid.from_dict(compact)
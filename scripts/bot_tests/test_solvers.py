@@ -0,0 +1,162 @@
+""" Fills of the shipped grids with each solver
+"""
+
+# Standard library
+import itertools
+
+# Third-party
+import numpy as np
+import pytest
+
+# CrossCosmos
+from crosscosmos import bot
+from crosscosmos.array_trie import NO_NODE, ROOT, ArrayTrie, UsedWords
+from crosscosmos.bot import LetterSequenceStatus, SolveMode
+from crosscosmos.corpus import Corpus
+from crosscosmos.grid import CellStatus, Grid, GridStatus
+from crosscosmos.solver import RestartPolicy, SlotSolver
+from crosscosmos.stats import SolveStats
+from crosscosmos.word_index import WordIndex
+from crosscosmos.word_solver import WordSolver
+
+MAX_TIME = 20
+SEED = 20240101
+MIN_SCORE = 50
+
+
+def entries(grid) -> list:
+    # Runs of a single white cell are not entries
+    return ["".join(grid[i, j].value for i, j in slot.cells) for slot in grid.slots if slot.length > 1]
+
+
+def assert_valid_fill(grid, corpus):
+    words = entries(grid)
+    assert all(corpus.index[len(w)].count(list(enumerate(w))) > 0 for w in words)
+    assert len(set(words)) == len(words)
+
+
+def locked_letters(grid) -> dict:
+    return {(i, j): grid[i, j].value
+            for i in range(grid.row_count) for j in range(grid.col_count) if grid[i, j].status == CellStatus.LOCKED}
+
+
+@pytest.mark.parametrize("mode", list(SolveMode))
+@pytest.mark.parametrize("grid_file", ["test_grid_55.json", "test_grid_88.json"])
+def test_every_mode_completes(load_grid, corpus, mode, grid_file):
+    grid = load_grid(grid_file)
+    locked = locked_letters(grid)
+    stats = None if mode == SolveMode.PARALLEL else SolveStats()
+    assert bot.solve(grid, MAX_TIME, mode=mode, stats=stats, seed=SEED) == GridStatus.COMPLETE
+    assert_valid_fill(grid, corpus)
+    assert locked_letters(grid) == locked
+
+
+def test_letter_fills_test_grid_55(load_grid, corpus):
+    grid = load_grid("test_grid_55.json")
+    assert bot.solve(grid, MAX_TIME, mode=SolveMode.LETTER) == GridStatus.COMPLETE
+    assert_valid_fill(grid, corpus)
+
+
+def test_letter_ignores_unlocked_letters_ahead(load_grid, corpus):
+    # Letters that are merely set (not locked) are overwritten, so they must not constrain the cells ahead
+    grid = load_grid("test_grid_55.json")
+    grid[0, 1].update("Q")
+    grid[1, 1].update("Q")
+    grid[1, 2].update("X")
+    assert bot.solve(grid, MAX_TIME, mode=SolveMode.LETTER) == GridStatus.COMPLETE
+    assert_valid_fill(grid, corpus)
+
+
+@pytest.mark.parametrize("grid_file", ["test_grid.json", "test_grid_55.json", "test_grid_88.json"])
+def test_letter_keeps_locked_cells(load_grid, grid_file):
+    grid = load_grid(grid_file)
+    locked = locked_letters(grid)
+    assert bot.solve(grid, MAX_TIME, mode=SolveMode.LETTER) == GridStatus.COMPLETE
+    assert locked_letters(grid) == locked
+
+
+def test_word_fills_around_single_cell_runs(tmp_path, corpus):
+    # Without 1-letter words, so that a 1-cell run only fills if it is not taken for an entry
+    path = tmp_path / "no_single_letters.xcidx"
+    WordIndex({n: bucket for n, bucket in corpus.index.buckets.items() if n > 1}).save(path)
+    corpus = Corpus.from_compiled(path)
+
+    grid = Grid((5, 5), corpus)
+    grid.set_grid(0, 1, None)
+    grid.set_grid(4, 3, None)
+    assert sorted(s.start for s in grid.slots if s.length == 1) == [(0, 0), (4, 4)]
+    assert bot.solve(grid, MAX_TIME, mode=SolveMode.WORD) == GridStatus.COMPLETE
+    assert_valid_fill(grid, corpus)
+    assert grid[0, 0].value and grid[4, 4].value
+
+
+def entry_score(corpus, word: str) -> int:
+    bucket = corpus.index[len(word)]
+    return int(bucket.scores[bucket.match(list(enumerate(word)))[0]])
+
+
+@pytest.mark.parametrize("grid_file", ["test_grid_55.json", "test_grid_88.json"])
+def test_word_solver_min_score(load_grid, corpus, grid_file):
+    grid = load_grid(grid_file)
+    locked = [slot for slot in grid.slots if all(grid[i, j].status == CellStatus.LOCKED for i, j in slot.cells)]
+    solver = WordSolver(grid, max_time=MAX_TIME, min_score=MIN_SCORE)
+    assert solver.solve() == GridStatus.COMPLETE
+    assert_valid_fill(grid, corpus)
+
+    # Including the entries completed by crossing words (locked entries are exempt)
+    for slot in grid.slots:
+        if slot not in locked:
+            word = "".join(grid[i, j].value for i, j in slot.cells)
+            assert entry_score(corpus, word) >= MIN_SCORE, word
+
+
+def brute_force_3x3(words: list) -> bool:
+    """ Whether a 3x3 grid (without black squares) can be filled with distinct words from a list
+    """
+    for rows in itertools.product(words, repeat=3):
+        entries_3x3 = list(rows) + ["".join(col) for col in zip(*rows)]
+        if len(set(entries_3x3)) == 6 and all(w in words for w in entries_3x3[3:]):
+            return True
+    return False
+
+
+@pytest.mark.parametrize("restarts", [RestartPolicy.NONE, RestartPolicy.LUBY])
+def test_slot_solver_agrees_with_brute_force(tmp_path, restarts):
+    # Conflict-directed backjumping and nogood learning must never prune the only fills of a grid
+    rng = np.random.default_rng(SEED)
+    all_words = ["".join(w) for w in itertools.product("ABC", repeat=3)]
+    outcomes = set()
+    for k in range(40):
+        words = sorted(rng.choice(all_words, int(rng.integers(6, 14)), replace=False).tolist())
+        path = tmp_path / f"words_{k}.xcidx"
+        WordIndex.from_words(words, rng.integers(0, 100, len(words)).tolist()).save(path)
+
+        grid = Grid((3, 3))
+        solver = SlotSolver(grid, Corpus.from_compiled(path), max_time=MAX_TIME, seed=k, restarts=restarts,
+                            restart_base=2)
+        status = solver.solve()
+        expected = brute_force_3x3(words)
+        assert status == (GridStatus.COMPLETE if expected else GridStatus.INVALID), words
+        if expected:
+            rows = ["".join(grid[i, j].value for j in range(3)) for i in range(3)]
+            filled = rows + ["".join(col) for col in zip(*rows)]
+            assert len(set(filled)) == 6 and all(w in words for w in filled)
+        outcomes.add(expected)
+
+    assert outcomes == {True, False}
+
+
+@pytest.mark.parametrize("letter", ["1", "[", "a"])
+def test_letter_sequence_rejects_non_letters(letter):
+    trie = ArrayTrie.from_words(3, ["KIT", "ZIP", "AXE"])
+    status, node = bot.validate_grid_letter_sequence(trie, ROOT, letter, False, UsedWords())
+    assert status == LetterSequenceStatus.INVALID
+    assert node == NO_NODE
+
+
+def test_letter_rejects_locked_non_letters(load_grid):
+    # Cell.update only takes A-Z, but a grid file can still hold other characters
+    grid = load_grid("test_grid_55.json")
+    grid.letters[0, 0] = ord("1")
+    grid.statuses[0, 0] = CellStatus.LOCKED.value
+    assert bot.solve(grid, MAX_TIME, mode=SolveMode.LETTER) == GridStatus.INVALID
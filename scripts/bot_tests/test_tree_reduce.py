@@ -36,10 +36,10 @@ n_valid = np.zeros(len(possible_words), dtype=int)
 
 for i, w in enumerate(possible_words):
     grid.set_word(w.word, x, y, word_direction)
-    grid_status, n_possible = grid.count_possible(cell_list, query_level=2)
+    n_possible = grid.count_possible(cell_list, query_level=2)
     n_valid[i] = n_possible
 
-options = sorted([(n, w) for n, w in zip(possible_words, n_valid)], key=lambda v: v[0])
+options = sorted([(n, w.word) for n, w in zip(n_valid, possible_words)], key=lambda v: v[0])
 
 # Reset grid
 grid = original_grid
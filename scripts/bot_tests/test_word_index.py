@@ -0,0 +1,59 @@
+""" Word index queries and the compiled index format
+"""
+
+# Third-party
+import numpy as np
+import pytest
+
+# CrossCosmos
+from crosscosmos.corpus import Corpus
+from crosscosmos.word_index import WordIndex
+
+WORDS = ["CAT", "COT", "DOG", "CART", "CARD", "DOGS", "AB1", "ACT"]
+SCORES = [50, 20, 40, 60, 10, 30, 70, 50]
+
+
+def test_buckets_in_score_order():
+    index = WordIndex.from_words(WORDS, SCORES)
+    assert index[3].words == ["CAT", "ACT", "DOG", "COT"]  # "AB1" is skipped, ties keep their order
+    assert index[3].scores.tolist() == [50, 50, 40, 20]
+    assert index[4].words == ["CART", "DOGS", "CARD"]
+
+
+def test_match():
+    index = WordIndex.from_words(WORDS, SCORES)
+    assert [index[3].words[k] for k in index[3].match([(2, "T")])] == ["CAT", "ACT", "COT"]
+    assert [WORDS[k] for k in index.match(3, [(2, "T")])] == ["CAT", "ACT", "COT"]  # Corpus indices
+    assert [WORDS[k] for k in index.match(4, [(0, "C"), (3, "D")])] == ["CARD"]
+    assert index[3].count([(0, "Z")]) == 0
+    assert index[3].pattern_mask(np.array([ord("C"), 0, 0])).tolist() == index[3].match_mask([(0, "C")]).tolist()
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_load_round_trip(tmp_path, corpus, mmap):
+    index = corpus.index
+    path = tmp_path / "corpus.xcidx"
+    index.save(path, metadata=dict(source="test"))
+
+    loaded = WordIndex.load(path, mmap=mmap)
+    assert loaded.metadata == dict(source="test")
+    assert len(loaded) == len(index)
+    assert sorted(loaded.buckets) == sorted(index.buckets)
+    for n, bucket in index.buckets.items():
+        assert loaded[n].words == bucket.words
+        assert np.array_equal(loaded[n].scores, bucket.scores)
+        assert np.array_equal(loaded[n].masks, bucket.masks)
+
+    for pattern in ["C-T", "--ING", "Q----", "S---S--"]:
+        letters = [(i, c) for i, c in enumerate(pattern) if c != "-"]
+        assert np.array_equal(loaded.match(len(pattern), letters), index.match(len(pattern), letters))
+
+
+def test_compiled_corpus(tmp_path):
+    path = tmp_path / "corpus.xcidx"
+    WordIndex.from_words(WORDS, SCORES).save(path)
+
+    corpus = Corpus.from_compiled(path)
+    assert [(w.word, w.score) for w in corpus.word_list] == [("CAT", 50), ("ACT", 50), ("DOG", 40), ("COT", 20),
+                                                             ("CART", 60), ("DOGS", 30), ("CARD", 10)]
+    assert [w.word for w in corpus.match(4, [(0, "d")])] == ["DOGS"]
@@ -1,38 +1,65 @@
 """ Root __init__.py for CrossCosmos.
+
+Submodules (and the enums re-exported below) are imported lazily on first attribute access, so that e.g. a headless
+fill job does not pay for the gui (arcade), digraph (networkx/matplotlib) or data model imports it never uses.
 """
 
+# Standard library imports
+import importlib
+
 # Retrieve the explicitly exported variables from crosscosmos.config
 from .config import *
 
 # Expose submodules
-from . import (
-    corpus,
-    data_models,
-    digraph,
-    grid,
-    gui,
-    io_utils,
-    letter_utils,
-    log_config,
-    query,
-    standards,
-    smatch,
-    wordlists
-)
-
-# Enums
-from .bot import (
-    LetterStatus,
-    LetterSequenceStatus
-)
-from .grid import (
-    CellStatus,
-    GridDirection,
-    GridStatus,
-    WordDirection,
-    GridSymmetry,
-    MoveDirection
-)
+_SUBMODULES = {
+    "array_trie",
+    "bot",
+    "corpus",
+    "data_models",
+    "digraph",
+    "grid",
+    "gui",
+    "io_utils",
+    "letter_utils",
+    "log_config",
+    "parallel",
+    "query",
+    "standards",
+    "stats",
+    "smatch",
+    "solver",
+    "word_index",
+    "word_solver",
+    "wordlists",
+}
+
+# Enums (name -> defining submodule)
+_ATTRIBUTES = {
+    "LetterStatus": "bot",
+    "LetterSequenceStatus": "bot",
+    "SolveMode": "bot",
+    "CellStatus": "grid",
+    "GridDirection": "grid",
+    "GridStatus": "grid",
+    "WordDirection": "grid",
+    "GridSymmetry": "grid",
+    "MoveDirection": "grid",
+}
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    if name in _ATTRIBUTES:
+        value = getattr(importlib.import_module(f".{_ATTRIBUTES[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | _SUBMODULES | set(_ATTRIBUTES))
+
 
 # Setup logging
 from . import log_config
@@ -0,0 +1,201 @@
+""" Fixed-length word trie stored in flat integer arrays, for the letter-by-letter solver (see crosscosmos.bot)
+
+Every node has a row in a (n_nodes x 26) child table, so stepping from a node to its child for a letter is a single
+array lookup; a solver keeps the node reached at each cell and extends it one letter at a time, instead of walking the
+trie from the root with the whole prefix. Node 0 is the root, and since the root is nobody's child, a child id of 0
+means "no child".
+
+Each node also counts the words below it. All words of a trie have the same length, so the nodes at that depth are
+exactly the words.
+
+A trie is never modified once built (its arrays are read-only), so it can be built once per process, or saved to and
+memory-mapped from .npy files, and shared by any number of fills. The words a fill has used are kept in its own
+UsedWords, which discounts them from the counts.
+"""
+
+# Standard library imports
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+
+logger = logging.getLogger(__name__)
+
+ROOT = 0
+NO_NODE = 0
+
+
+class ArrayTrie(object):
+
+    def __init__(self, length: int, children: np.ndarray, parents: np.ndarray, counts: np.ndarray):
+        """
+        Args:
+            length: length of every word in the trie
+            children: (n_nodes x 26) child node of each node for each letter (A=0, ..., Z=25), or NO_NODE
+            parents: parent node of each node (ROOT for the root itself)
+            counts: number of words below each node
+        """
+        for array in (children, parents, counts):
+            array.flags.writeable = False
+        self.length = length
+        self.children = children
+        self.parents = parents
+        self.counts = counts
+
+    def __len__(self):
+        """ Number of words
+        """
+        return int(self.counts[ROOT])
+
+    def __repr__(self):
+        return f"ArrayTrie(length={self.length}, n_nodes={len(self.parents)}, n_words={len(self)})"
+
+    def __contains__(self, word: str) -> bool:
+        return len(word) == self.length and self.find(word) != NO_NODE
+
+    @classmethod
+    def from_letters(cls, letters: np.ndarray) -> "ArrayTrie":
+        """ Build a trie from a (n_words x length) matrix of letter codes (A=0, ..., Z=25)
+
+        The words are sorted, so that the nodes of each depth are the runs of equal prefixes; each depth is then built
+        with a handful of vectorized operations.
+        """
+        length = letters.shape[1]
+        letters = np.unique(letters, axis=0)  # Sorted, without duplicates
+
+        edges = []  # (parent nodes, letters, child nodes) for each depth
+        counts = [np.array([len(letters)], dtype=np.int32)]
+        prefix_nodes = np.zeros(len(letters), dtype=np.int32)  # Node of each word's prefix at the current depth
+        new_prefix = np.zeros(len(letters), dtype=bool)
+        new_prefix[:1] = True
+        n_nodes = 1
+        for d in range(length):
+            new_prefix[1:] |= letters[1:, d] != letters[:-1, d]
+            nodes = (n_nodes - 1 + np.cumsum(new_prefix, dtype=np.int64)).astype(np.int32)
+            edges.append((prefix_nodes[new_prefix], letters[new_prefix, d], nodes[new_prefix]))
+            counts.append(np.bincount(nodes - n_nodes, minlength=int(new_prefix.sum())).astype(np.int32))
+            n_nodes += int(new_prefix.sum())
+            prefix_nodes = nodes
+
+        children = np.zeros((n_nodes, 26), dtype=np.int32)
+        parents = np.zeros(n_nodes, dtype=np.int32)
+        for parent_nodes, edge_letters, child_nodes in edges:
+            children[parent_nodes, edge_letters] = child_nodes
+            parents[child_nodes] = parent_nodes
+
+        return cls(length, children, parents, np.concatenate(counts))
+
+    @classmethod
+    def from_words(cls, length: int, words: List[str]) -> "ArrayTrie":
+        """ Build a trie from words of the given length (made up of the letters A-Z)
+        """
+        if words:
+            letters = np.frombuffer("".join(words).upper().encode("ascii"), dtype=np.uint8).reshape(-1, length) - 65
+        else:
+            letters = np.empty((0, length), dtype=np.uint8)
+        return cls.from_letters(letters)
+
+    def step(self, node: int, letter: int) -> int:
+        """ Child of a node for a letter code (A=0, ..., Z=25), or NO_NODE
+        """
+        return self.children[node, letter]
+
+    def find(self, word: str) -> int:
+        """ Node of a word or prefix, or NO_NODE
+        """
+        node = ROOT
+        for c in word.upper():
+            k = ord(c) - 65
+            if not 0 <= k < 26:
+                return NO_NODE
+            node = self.children[node, k]
+            if node == NO_NODE:
+                return NO_NODE
+        return node
+
+    def save(self, directory: Path):
+        """ Save the trie as .npy files in a directory (see ArrayTrie.load)
+
+        Each file is written under a temporary name first, and the counts (which ArrayTrie.exists checks for) last,
+        so that a concurrent reader never sees a partial trie.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, array in [("children", self.children), ("parents", self.parents), ("counts", self.counts)]:
+            path = directory / f"{name}_{self.length}.npy"
+            tmp_path = directory / f"{name}_{self.length}.{os.getpid()}.tmp.npy"
+            np.save(tmp_path, array)
+            os.replace(tmp_path, path)
+
+    @staticmethod
+    def exists(directory: Path, length: int) -> bool:
+        """ Whether a trie of the given length has been saved in a directory
+        """
+        return (Path(directory) / f"counts_{length}.npy").exists()
+
+    @classmethod
+    def load(cls, directory: Path, length: int, mmap: bool = True) -> "ArrayTrie":
+        """ Load a trie saved with ArrayTrie.save
+
+        With mmap=True, the arrays are memory-mapped, so that every process loading the trie shares one page-cached
+        copy.
+        """
+        directory = Path(directory)
+        mmap_mode = "r" if mmap else None
+        return cls(length,
+                   np.load(directory / f"children_{length}.npy", mmap_mode=mmap_mode),
+                   np.load(directory / f"parents_{length}.npy", mmap_mode=mmap_mode),
+                   np.load(directory / f"counts_{length}.npy", mmap_mode=mmap_mode))
+
+
+class UsedWords(object):
+    """ Words used so far in a single fill, layered over shared tries
+
+    For every node on the path of a used word, the number of used words below it is kept, so that a node only matches
+    while some word below it is still unused, exactly as if the used words had been taken out of the trie.
+    """
+
+    def __init__(self):
+        self.n_used: Dict[Tuple[int, int], int] = {}  # (trie length, node) -> number of used words below the node
+
+    def __len__(self):
+        """ Number of used words
+        """
+        return sum(n for (_, node), n in self.n_used.items() if node == ROOT)
+
+    def __repr__(self):
+        return f"UsedWords(n={len(self)})"
+
+    def is_available(self, trie: ArrayTrie, node: int) -> bool:
+        """ Whether any unused word of a trie goes through (or ends at) a node
+        """
+        return node != NO_NODE and trie.counts[node] > self.n_used.get((trie.length, node), 0)
+
+    def add(self, trie: ArrayTrie, node: int):
+        """ Mark the word ending at a node as used (a no-op if it already is)
+        """
+        node = int(node)
+        if (trie.length, node) in self.n_used:
+            return
+        for _ in range(trie.length + 1):
+            key = (trie.length, node)
+            self.n_used[key] = self.n_used.get(key, 0) + 1
+            node = int(trie.parents[node])
+
+    def discard(self, trie: ArrayTrie, node: int):
+        """ Make the word ending at a node available again (a no-op if it is not used)
+        """
+        node = int(node)
+        if (trie.length, node) not in self.n_used:
+            return
+        for _ in range(trie.length + 1):
+            key = (trie.length, node)
+            self.n_used[key] -= 1
+            if not self.n_used[key]:
+                del self.n_used[key]
+            node = int(trie.parents[node])
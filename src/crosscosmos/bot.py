@@ -1,15 +1,20 @@
 # Standard
 from enum import Enum
 import time
-from typing import List
+from typing import Dict, List, Tuple
 
 # Third-party
 import logging
-import pygtrie
+import numpy as np
 
 # CrossCosmos
 import crosscosmos as xc
-from crosscosmos.grid import CellStatus, WordDirection, MoveDirection
+from crosscosmos.array_trie import NO_NODE, ROOT, ArrayTrie, UsedWords
+from crosscosmos.grid import SLOT_AXIS, CellStatus, WordDirection, MoveDirection
+from crosscosmos.parallel import ParallelSlotSolver
+from crosscosmos.solver import ScoredSlotSolver, SlotSolver
+from crosscosmos.stats import SolveStats
+from crosscosmos.word_solver import WordSolver
 
 logger = logging.getLogger(__name__)
 
@@ -25,35 +30,103 @@ class LetterSequenceStatus(Enum):
     VALID_WORD = 3
 
 
-def check_letter_sequence(cell, the_grid, trie_list, direction: WordDirection):
-    cell_sequence = the_grid.full_word_from_cell(cell.x, cell.y, direction)
-    word_len = the_grid.word_len(cell.x, cell.y, direction)
-    return trie_list[word_len].has_node(str(cell_sequence))
-
-
-def reset_cell_with_trie(the_grid, x: int, y: int, trie_list: List[pygtrie]):
+class SolveMode(Enum):
+    LETTER = 1  # Cell-by-cell backtracking over the grid tries
+    SLOT = 2  # Entry-by-entry constraint propagation (see crosscosmos.solver)
+    PARALLEL = 3  # Several differently-seeded slot solvers racing in parallel (see crosscosmos.parallel)
+    SCORED = 4  # Branch and bound for the highest average word score (see crosscosmos.solver.ScoredSlotSolver)
+    WORD = 5  # Whole words from the index, placed entry by entry (see crosscosmos.word_solver)
+
+
+def prefix_node(cell, nodes: List[List[int]], direction: WordDirection) -> int:
+    """ Trie node of the letters before a cell in its word (the node reached at the previous cell, or the root)
+    """
+    match direction:
+        case WordDirection.HORIZONTAL:
+            return ROOT if cell.is_h_start else nodes[cell.x][cell.y - 1]
+        case WordDirection.VERTICAL:
+            return ROOT if cell.is_v_start else nodes[cell.x - 1][cell.y]
+
+
+class ForwardChecker(object):
+    """ Forward checking for the letter-by-letter solver
+
+    After a letter is placed, the down entry through its cell is matched against the corpus index with every letter it
+    now holds (locked letters further down included), and so is the across entry, restricted at each of its empty cells
+    to the letters that the down entry through that cell still allows. If either is left without a candidate, the
+    letter is rejected right away, rather than once the solver reaches the dead cell.
+
+    Words already used elsewhere in the grid still count as candidates here; the used-word check catches those.
+    """
+
+    def __init__(self, grid: xc.grid.Grid, index: xc.word_index.WordIndex):
+        self.grid = grid
+        self.index = index
+        self._allowed: Dict[Tuple[int, bytes], np.ndarray] = {}  # (slot id, letters) -> allowed letters
+
+    def slot_letters(self, slot: xc.grid.GridSlot) -> np.ndarray:
+        """ Character code in each cell of an entry (0 if empty)
+        """
+        rows, cols = zip(*slot.cells)
+        return self.grid.letters[rows, cols]
+
+    def allowed_letters(self, slot: xc.grid.GridSlot) -> np.ndarray:
+        """ (length x 26) whether any word matching the entry's current letters has each letter at each position
+        """
+        letters = self.slot_letters(slot)
+        key = (slot.id, letters.tobytes())
+        if key not in self._allowed:
+            bucket = self.index[slot.length]
+            mask = bucket.pattern_mask(letters)
+            allowed = np.zeros((slot.length, 26), dtype=bool)
+            allowed[np.arange(slot.length), bucket.letters[bucket.mask_to_indices(mask)]] = True
+            self._allowed[key] = allowed
+        return self._allowed[key]
+
+    def check(self, i: int, j: int) -> bool:
+        """ Whether the entries through [i, j] can still be completed, given the letters now in the grid
+        """
+        if not self.allowed_letters(self.grid.slot_at(i, j, WordDirection.VERTICAL)).any():
+            return False
+
+        across = self.grid.slot_at(i, j, WordDirection.HORIZONTAL)
+        bucket = self.index[across.length]
+        letters = self.slot_letters(across)
+        mask = bucket.pattern_mask(letters)
+        for k in np.flatnonzero(letters == 0):
+            x, y = across.cells[k]
+            down = self.grid.slot_at(x, y, WordDirection.VERTICAL)
+            allowed = self.allowed_letters(down)[self.grid.cell_offsets[x, y, SLOT_AXIS[WordDirection.VERTICAL]]]
+            if not allowed.any():
+                return False
+            if not allowed.all():
+                mask = mask & np.bitwise_or.reduce(bucket.masks[k][allowed], axis=0)
+        return bool(mask.any())
+
+
+def reset_cell_with_trie(the_grid, x: int, y: int, trie_list: List[ArrayTrie], used: UsedWords):
     # Reset the cell's status
     removed_words = the_grid[x, y].reset_cell()
     c = the_grid[x, y]
 
-    # If the cell had previously removed a word from the trie put it back in
+    # If the cell had completed (and so used up) a word, make it available again
     if removed_words:
-        for rem_word, rem_dir in removed_words:
+        for rem_node, rem_dir in removed_words:
             match rem_dir:
                 case WordDirection.HORIZONTAL:
-                    trie_list[c.hlen][rem_word] = True
+                    used.discard(trie_list[c.hlen], rem_node)
                 case WordDirection.VERTICAL:
-                    trie_list[c.vlen][rem_word] = True
+                    used.discard(trie_list[c.vlen], rem_node)
 
 
-def move_back_horizontal(grid, x: int, y: int, trie_list):
+def move_back_horizontal(grid, x: int, y: int, trie_list, used: UsedWords):
     # Save for readability
     on_left_column = y == 0
     on_right_column = y == (grid.col_count - 1)
     on_top_row = x == 0
     on_bottom_row = x == (grid.row_count - 1)
 
-    reset_cell_with_trie(grid, x, y, trie_list)
+    reset_cell_with_trie(grid, x, y, trie_list, used)
     new_x = x
     new_y = y
     status = xc.GridStatus.INCOMPLETE
@@ -68,20 +141,124 @@ def move_back_horizontal(grid, x: int, y: int, trie_list):
     return new_x, new_y, status
 
 
-def validate_grid_letter_sequence(grid_trie: pygtrie, letter_sequence: str, is_end: bool) -> LetterSequenceStatus:
-    node_in_trie = grid_trie.has_node(letter_sequence)
-    if is_end and node_in_trie == pygtrie.Trie.HAS_VALUE:
-        return LetterSequenceStatus.VALID_WORD
-    elif not is_end and node_in_trie == pygtrie.Trie.HAS_SUBTRIE:
-        return LetterSequenceStatus.VALID_SUBTRIE
+def validate_grid_letter_sequence(grid_trie: ArrayTrie,
+                                  node: int,
+                                  letter: str,
+                                  is_end: bool,
+                                  used: UsedWords) -> Tuple[LetterSequenceStatus, int]:
+    """ Extend the letter sequence ending at a trie node by one letter
+
+    Returns:
+        The status of the extended sequence (INVALID if it is not a letter A-Z, or if every word it could become is
+        already used), and its node
+    """
+    k = ord(letter) - 65
+    if not 0 <= k < 26:
+        return LetterSequenceStatus.INVALID, NO_NODE
+    node = grid_trie.step(node, k)
+    if not used.is_available(grid_trie, node):
+        return LetterSequenceStatus.INVALID, node
+    elif is_end:
+        return LetterSequenceStatus.VALID_WORD, node  # All words of a trie have the same length
     else:
-        return LetterSequenceStatus.INVALID
-
+        return LetterSequenceStatus.VALID_SUBTRIE, node
 
-def solve(grid: xc.grid.Grid, max_time=30):
 
-    # Initialize
+def log_status(grid: xc.grid.Grid, grid_status: xc.grid.GridStatus):
+    match grid_status:
+        case xc.GridStatus.COMPLETE:
+            logger.info("Grid complete!")
+        case xc.GridStatus.INVALID:
+            logger.info("No valid solution found for grid")
+        case xc.GridStatus.INCOMPLETE:
+            logger.info("Max solve time exceeded")
+    logger.debug("\n" + grid.to_str())
+
+
+def solve_slots(grid: xc.grid.Grid, max_time=30, **kwargs) -> xc.grid.GridStatus:
+    slot_solver = SlotSolver(grid, max_time=max_time, **kwargs)
+    grid_status = slot_solver.solve()
+    logger.info(f"Slot solver finished with status {grid_status.name} "
+                f"({slot_solver.n_nodes} nodes, {slot_solver.n_backtracks} backtracks)")
+
+    log_status(grid, grid_status)
+    return grid_status
+
+
+def solve_parallel(grid: xc.grid.Grid, max_time=30, **kwargs) -> xc.grid.GridStatus:
+    parallel_solver = ParallelSlotSolver(grid, max_time=max_time, **kwargs)
+    grid_status = parallel_solver.solve()
+    logger.info(f"Parallel solver finished with status {grid_status.name} "
+                f"({len(parallel_solver.fills)} fills from {parallel_solver.n_workers} workers)")
+
+    log_status(grid, grid_status)
+    return grid_status
+
+
+def solve_scored(grid: xc.grid.Grid, max_time=30, min_score: int = None, **kwargs) -> xc.grid.GridStatus:
+    scored_solver = ScoredSlotSolver(grid, max_time=max_time, min_score=min_score, **kwargs)
+    grid_status = scored_solver.solve()
+    logger.info(f"Scored solver finished with status {grid_status.name} "
+                f"({scored_solver.n_fills} improving fills, best average score {scored_solver.best_score}, "
+                f"optimal: {scored_solver.optimal})")
+
+    log_status(grid, grid_status)
+    return grid_status
+
+
+def solve_words(grid: xc.grid.Grid, max_time=30, **kwargs) -> xc.grid.GridStatus:
+    word_solver = WordSolver(grid, max_time=max_time, **kwargs)
+    grid_status = word_solver.solve()
+    logger.info(f"Word solver finished with status {grid_status.name} "
+                f"({word_solver.n_nodes} nodes, {word_solver.n_backtracks} backtracks)")
+
+    log_status(grid, grid_status)
+    return grid_status
+
+
+def solve(grid: xc.grid.Grid,
+          max_time=30,
+          mode: SolveMode = SolveMode.LETTER,
+          stats: SolveStats = None,
+          seed: int = None) -> xc.grid.GridStatus:
+    """ Fill the grid
+
+    Args:
+        grid: grid to fill
+        max_time: time budget in seconds
+        mode: solver to use
+        stats: statistics to record the run in (not supported by SolveMode.PARALLEL)
+        seed: random seed for the value ordering of SolveMode.SLOT and SolveMode.PARALLEL (the letter-by-letter solver
+            follows the grid's cell queues)
+
+    Returns:
+        GridStatus.COMPLETE if the grid was filled, GridStatus.INVALID if no fill exists, and
+        GridStatus.INCOMPLETE if the time budget ran out first
+    """
+
+    if mode == SolveMode.SLOT:
+        return solve_slots(grid, max_time, stats=stats, seed=seed)
+    if mode == SolveMode.PARALLEL:
+        return solve_parallel(grid, max_time, seed=seed)
+    if mode == SolveMode.SCORED:
+        return solve_scored(grid, max_time, stats=stats)
+    if mode == SolveMode.WORD:
+        return solve_words(grid, max_time, stats=stats)
+
+    # Initialize. Only LOCKED cells are fixed: letters set by hand or by an earlier fill are cleared, so that the
+    # forward checker does not mistake them for constraints on the cells ahead.
+    # The tries are shared (e.g. with copies of the grid) and never modified: the words used in this fill are kept in
+    # its own UsedWords, and any left over from an earlier (aborted) fill are forgotten
+    grid.clear()
     tries = grid.tries
+    used = UsedWords()
+    for search_state in grid.search_states.values():
+        search_state.removed_words = []
+    if grid.corpus.index is None:
+        grid.corpus.build_index()
+    checker = ForwardChecker(grid, grid.corpus.index)
+    h_nodes = [[ROOT] * grid.col_count for _ in range(grid.row_count)]  # Trie node reached at each cell
+    v_nodes = [[ROOT] * grid.col_count for _ in range(grid.row_count)]
     grid_status = xc.GridStatus.INCOMPLETE
     start_time = time.time()
 
@@ -96,18 +273,19 @@ def solve(grid: xc.grid.Grid, max_time=30):
     while grid_status == grid_status.INCOMPLETE:
 
         n_iters += 1
-        # if n_iters % 1000 == 0:
         if n_iters % 10 == 0:
             if time.time() - start_time > max_time:
-                print("Max solve time exceeded")
-                return
-
-            grid.print()
-            print()
+                grid_status = xc.GridStatus.INCOMPLETE
+                break
 
         # Get the current grid value
         c = grid[i, j]
 
+        if stats:
+            stats.count("iterations")
+            stats.depth(i * grid.col_count + j)
+            stats.event("cell", i=i, j=j, status=c.status.name)
+
         # Initialize variables
         move_dir = MoveDirection.FORWARD_HORIZONTAL
         letter_status = LetterStatus.INVALID
@@ -125,33 +303,36 @@ def solve(grid: xc.grid.Grid, max_time=30):
             # A locked square is automatically considered "Valid"
             letter_status = LetterStatus.VALID
 
-            # Get the cross word up to this point
-            trie_has_h_word = check_letter_sequence(c, grid, tries, WordDirection.HORIZONTAL)
-            trie_has_v_word = check_letter_sequence(c, grid, tries, WordDirection.VERTICAL)
-
-            # See if the word up to now is valid. If not, move back
-            if not trie_has_h_word or not trie_has_v_word:
+            # Extend the words up to this point with the locked letter
+            h_status, h_nodes[i][j] = validate_grid_letter_sequence(tries[c.hlen],
+                                                                    prefix_node(c, h_nodes, WordDirection.HORIZONTAL),
+                                                                    c.value,
+                                                                    c.is_h_end,
+                                                                    used)
+            v_status, v_nodes[i][j] = validate_grid_letter_sequence(tries[c.vlen],
+                                                                    prefix_node(c, v_nodes, WordDirection.VERTICAL),
+                                                                    c.value,
+                                                                    c.is_v_end,
+                                                                    used)
+            if stats:
+                stats.count("trie_lookups", 2)
+
+            # See if the words up to now are valid (and complete, at a barrier), and can still be completed. If not,
+            # move back
+            if h_status == LetterSequenceStatus.INVALID or v_status == LetterSequenceStatus.INVALID:
                 move_dir = MoveDirection.BACK_HORIZONTAL
-
-            # If either is true, move back one square to the left:
-            #     1) the horizontal word up to now is invalid
-            #     2) we've reached a horizontal barrier and don't have a valid word
-            if c.is_h_end and trie_has_h_word == pygtrie.Trie.HAS_SUBTRIE:
+            elif not checker.check(i, j):
                 move_dir = MoveDirection.BACK_HORIZONTAL
-
-            # If either is true, move back one square up:
-            #     1) the vertical word up to now is invalid
-            #     2) we've reached a vertical barrier and don't have a valid word
-            if c.is_v_end and trie_has_v_word == pygtrie.Trie.HAS_SUBTRIE:
-                move_dir = MoveDirection.BACK_VERTICAL
-
-        # TODO: for longer words, maybe skip the letter looping but instead just look for 8(or whatever) letter 
-        #  words starting with what is currently in the grid
+                if stats:
+                    stats.count("forward_check_prunes")
 
         # TODO: need for some longer DB-style checking
         #   queryL length(word)==7 AND SUBSTRING(word,3,1)=='E' AND SUBSTRING(word,8,1)=='A'
         #   if no results, then return. If 1 result, then fill.
 
+        if stats and letter_status != LetterStatus.VALID:
+            stats.domain_size(len(grid[i, j].queue))
+
         # Choose the next letter by proceeding through the grid entry's letter list and selecting the
         # first letter than yields a valid subtrie
         while letter_status != LetterStatus.VALID:
@@ -166,33 +347,46 @@ def solve(grid: xc.grid.Grid, max_time=30):
             grid[i, j].status = CellStatus.SET
 
             # Check if the horizontal letter sequence is valid
-
-            h_cell_sequence = grid.full_word_from_cell(c.x, c.y, WordDirection.HORIZONTAL)
-            horizontal_word_status = validate_grid_letter_sequence(tries[c.hlen],
-                                                                   str(h_cell_sequence),
-                                                                   c.is_h_end)
+            horizontal_word_status, h_node = validate_grid_letter_sequence(tries[c.hlen],
+                                                                           prefix_node(c, h_nodes,
+                                                                                       WordDirection.HORIZONTAL),
+                                                                           grid[i, j].value,
+                                                                           c.is_h_end,
+                                                                           used)
             horizontal_letter_accepted = horizontal_word_status != LetterSequenceStatus.INVALID
 
             # Check if the vertical letter sequence is valid
-            v_cell_sequence = grid.full_word_from_cell(c.x, c.y, WordDirection.VERTICAL)
-            vertical_word_status = validate_grid_letter_sequence(tries[c.vlen],
-                                                                 str(v_cell_sequence),
-                                                                 c.is_v_end)
+            vertical_word_status, v_node = validate_grid_letter_sequence(tries[c.vlen],
+                                                                         prefix_node(c, v_nodes,
+                                                                                     WordDirection.VERTICAL),
+                                                                         grid[i, j].value,
+                                                                         c.is_v_end,
+                                                                         used)
             vertical_letter_accepted = vertical_word_status != LetterSequenceStatus.INVALID
+            if stats:
+                stats.count("trie_lookups", 2)
+
+            # Forward check: reject the letter if it leaves any entry crossing this one without a candidate
+            if horizontal_letter_accepted and vertical_letter_accepted and not checker.check(i, j):
+                horizontal_letter_accepted = False
+                if stats:
+                    stats.count("forward_check_prunes")
 
             # The selected letter is only accepted if it is valid in both vertical and horizontal directions
             if horizontal_letter_accepted and vertical_letter_accepted:
                 letter_status = letter_status.VALID
+                h_nodes[i][j] = h_node
+                v_nodes[i][j] = v_node
 
-                # If horizontal word is complete, remove it to avoid duplication
+                # If horizontal word is complete, mark it as used to avoid duplication
                 if horizontal_word_status == LetterSequenceStatus.VALID_WORD:
-                    tries[c.hlen].pop(str(h_cell_sequence))
-                    grid[i, j].remove_word(str(h_cell_sequence), WordDirection.HORIZONTAL)
+                    used.add(tries[c.hlen], h_node)
+                    grid[i, j].remove_word(h_node, WordDirection.HORIZONTAL)
 
-                # If vertical word is complete, remove it to avoid duplication
+                # If vertical word is complete, mark it as used to avoid duplication
                 if vertical_word_status == LetterSequenceStatus.VALID_WORD:
-                    tries[c.vlen].pop(str(v_cell_sequence))
-                    grid[i, j].remove_word(str(v_cell_sequence), WordDirection.VERTICAL)
+                    used.add(tries[c.vlen], v_node)
+                    grid[i, j].remove_word(v_node, WordDirection.VERTICAL)
 
         # For debugging
         # grid.print()
@@ -216,10 +410,13 @@ def solve(grid: xc.grid.Grid, max_time=30):
                     i += 1
 
             case MoveDirection.BACK_HORIZONTAL:
+                if stats:
+                    stats.backtrack((i, j))
+
                 # Move back until a non-locked cell is encountered
                 continue_moving = True
                 while continue_moving:
-                    i, j, grid_status = move_back_horizontal(grid, i, j, tries)
+                    i, j, grid_status = move_back_horizontal(grid, i, j, tries, used)
                     if grid_status == xc.GridStatus.INVALID:
                         continue_moving = False
                     elif grid[i, j].status == CellStatus.BLACK or grid[i, j].status == CellStatus.LOCKED:
@@ -228,22 +425,21 @@ def solve(grid: xc.grid.Grid, max_time=30):
                         continue_moving = False
 
             case MoveDirection.BACK_VERTICAL:
+                if stats:
+                    stats.backtrack((i, j))
 
                 for left_of_cell in range(j):
-                    reset_cell_with_trie(grid, i, left_of_cell, tries)
+                    reset_cell_with_trie(grid, i, left_of_cell, tries, used)
                 for right_of_above in range(grid.col_count - j):
-                    reset_cell_with_trie(grid, i - 1, right_of_above, tries)
+                    reset_cell_with_trie(grid, i - 1, right_of_above, tries, used)
 
                 if on_top_row:  # Undefined behavior
                     grid_status = xc.GridStatus.INVALID
                 else:  # Move one square up the left
                     i -= 1
-    match grid_status:
-        case xc.GridStatus.COMPLETE:
-            print("Grid complete!")
-        case xc.GridStatus.INVALID:
-            print("No valid solution found for grid")
-    grid.print()
+
+    log_status(grid, grid_status)
+    return grid_status
 
 
 if __name__ == '__main__':
@@ -1,25 +1,44 @@
 # Standard library imports
+from collections import defaultdict
+from contextlib import contextmanager
+import gc
+import hashlib
+import json
 import logging
-from typing import List, Tuple, Union
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple, Union
 import re
 from enum import Enum
 
 # Third-party imports
+import numpy as np
+from pony import orm
 import pygtrie
 
 # Local imports
+from crosscosmos.data_models import (
+    collab_word_list_model,
+    diehl_model,
+    lafarge_model,
+    xword_tracker_model
+)
 from crosscosmos.data_models.xword_tracker_model import XwordWord
 from crosscosmos.data_models.collab_word_list_model import CollabWordListWord
 from crosscosmos.data_models.lafarge_model import LaFargeWord
 from crosscosmos.data_models.diehl_model import DiehlWord, TestWord
 # from crosscosmos.data_models.xword_tracker_model import 
 from crosscosmos import letter_utils
+from crosscosmos.array_trie import ArrayTrie
+from crosscosmos.word_index import IndexWordList, WordIndex
 
 logger = logging.getLogger(__name__)
 
 AZRE_PATTERN = "[a-zA-Z]"
 PLACEHOLDERS = [r"?", r"-", r" "]
 
+# Shortest word the word-list loaders keep by default
+MIN_WORD_LENGTH = 3
+
 
 class ModelSource(Enum):
     Test = 1
@@ -27,22 +46,106 @@ class ModelSource(Enum):
     LaFarge = 3
     CrosswordTracker = 4
     CollabWordList = 5
+    Compiled = 6
 
 
 score = {
     ModelSource.Test: lambda w: w.score,
     ModelSource.Diehl: lambda w: w.score,
     ModelSource.LaFarge: lambda w: w.collab_score,
-    ModelSource.CrosswordTracker: lambda w: 0  # Undefined
+    ModelSource.CrosswordTracker: lambda w: 0,  # Undefined
+    ModelSource.CollabWordList: lambda w: w.score,
+    ModelSource.Compiled: lambda w: w.score
+}
+
+# Score attribute of each database model (for filtering in SQL)
+score_attr = {
+    ModelSource.Test: "score",
+    ModelSource.Diehl: "score",
+    ModelSource.LaFarge: "collab_score",
+    ModelSource.CollabWordList: "score",
 }
 
 
+@contextmanager
+def paused_gc():
+    """ Pause the cyclic garbage collector, e.g. while building a pygtrie
+
+    Creating millions of trie nodes otherwise triggers a full collection every few hundred thousand objects, which
+    makes up most of the construction time.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def words_to_trie(words: Iterable[str]) -> pygtrie.CharTrie:
+    with paused_gc():
+        return pygtrie.CharTrie.fromkeys(words, True)
+
+
+def select_words(entity,
+                 model: ModelSource,
+                 min_length: int = None,
+                 max_length: int = None,
+                 min_score: int = None,
+                 sources: Iterable[str] = None,
+                 letters_only: bool = False) -> list:
+    """ Select the words of a word model, filtering on the stored length and the score in SQL
+
+    Must be called within a db_session, with the model's database bound.
+
+    Args:
+        entity: pony entity class (with "word" and "length" columns)
+        model: the entity's model source (for its score column)
+        min_length: shortest word length to keep
+        max_length: longest word length to keep
+        min_score: lowest score to keep (words without a score are dropped)
+        sources: keep only words listed in at least one of these sources (LaFarge only)
+        letters_only: drop words containing digits
+
+    Returns:
+        Entity instances
+    """
+    conditions = []
+    params = dict(min_length=min_length, max_length=max_length, min_score=min_score)
+    if min_length is not None:
+        conditions.append("length >= $min_length")
+    if max_length is not None:
+        conditions.append("length <= $max_length")
+    if min_score is not None:
+        if model not in score_attr:
+            raise ValueError(f"{model.name} words have no score")
+        conditions.append(f"{entity._adict_[score_attr[model]].columns[0]} >= $min_score")
+    if sources is not None:
+        if model != ModelSource.LaFarge:
+            raise ValueError(f"{model.name} words have no sources")
+        params["sources"] = json.dumps(list(sources))
+        conditions.append("EXISTS (SELECT 1 FROM json_each(sources) AS s "
+                          "WHERE s.value IN (SELECT value FROM json_each($sources)))")
+    if letters_only:
+        conditions.append("word NOT GLOB '*[0-9]*'")
+
+    sql = f'SELECT * FROM "{entity._table_}"'
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return list(entity.select_by_sql(sql, globals=params))
+
+
 class Corpus(object):
 
     def __init__(self, word_list, model: ModelSource):
         self.word_list = word_list
         self.trie = None
+        self.index = None
         self.model = model
+        self.compiled_path = None  # Set for corpora loaded with Corpus.from_compiled
+        self._by_length = None
+        self._tries: Dict[int, ArrayTrie] = {}  # Built (or loaded) by to_n_tries, by word length
 
     def __getitem__(self, position):
         return self.word_list[position]
@@ -50,42 +153,92 @@ class Corpus(object):
     def __repr__(self):
         return f"CrossCosmos.Corpus(n={len(self.word_list)})"
 
+    @property
+    def score_fn(self):
+        return score[self.model]
+
+    @property
+    def by_length(self) -> Dict[int, list]:
+        """ Words grouped by length (in a single pass over the word list, on first use)
+        """
+        if self._by_length is None:
+            by_length = defaultdict(list)
+            for w in self.word_list:
+                by_length[len(w.word)].append(w)
+            self._by_length = dict(by_length)
+        return self._by_length
+
     @classmethod
-    def from_crossword_tracker(cls):
+    def from_crossword_tracker(cls, min_length: int = MIN_WORD_LENGTH, max_length: int = None):
         logger.info("Loading crossword tracker ...")
-        words = [w for w in XwordWord.select() if
-                 not letter_utils.has_numbers(w.word)
-                 and len(w.word) >= 3
-                 ]
+        xword_tracker_model.bind()
+        with orm.db_session:
+            words = select_words(XwordWord, ModelSource.CrosswordTracker, min_length, max_length, letters_only=True)
         return cls(words, ModelSource.CrosswordTracker)
 
     @classmethod
-    def from_collab(cls):
+    def from_collab(cls, min_length: int = MIN_WORD_LENGTH, max_length: int = None, min_score: int = None):
         logger.info("Loading collab list ...")
-        words = [w for w in CollabWordListWord.select() if
-                 not letter_utils.has_numbers(w.word)
-                 and len(w.word) >= 3
-                 ]
+        collab_word_list_model.bind()
+        with orm.db_session:
+            words = select_words(CollabWordListWord, ModelSource.CollabWordList, min_length, max_length, min_score,
+                                 letters_only=True)
         return cls(words, ModelSource.CollabWordList)
 
     @classmethod
-    def from_lafarge(cls):
+    def from_lafarge(cls,
+                     min_length: int = MIN_WORD_LENGTH,
+                     max_length: int = None,
+                     min_score: int = None,
+                     sources: Iterable[str] = None):
+        """ Load the LaFarge words of length min_length to max_length, scored at least min_score (collab score)
+
+        If sources are given (e.g. ["diehl", "xd"]), only words from at least one of them are kept.
+        """
         logger.info("Loading LaFarge...")
-        words = [w for w in LaFargeWord.select() if
-                 not letter_utils.has_numbers(w.word)
-                 and len(w.word) >= 3
-                 ]
+        lafarge_model.bind()
+        with orm.db_session:
+            words = select_words(LaFargeWord, ModelSource.LaFarge, min_length, max_length, min_score, sources,
+                                 letters_only=True)
         return cls(words, ModelSource.LaFarge)
 
     @classmethod
-    def from_test(cls):
+    def from_test(cls, min_length: int = None, max_length: int = None, min_score: int = None):
         logger.info("Loading Test...")
-        return cls([w for w in TestWord.select()], ModelSource.Test)
+        diehl_model.bind_test()
+        with orm.db_session:
+            return cls(select_words(TestWord, ModelSource.Test, min_length, max_length, min_score), ModelSource.Test)
 
     @classmethod
-    def from_diehl(cls):
+    def from_diehl(cls, min_length: int = None, max_length: int = None, min_score: int = None):
         logger.info("Loading Diehl...")
-        return cls([w for w in DiehlWord.select()], ModelSource.Diehl)
+        diehl_model.bind()
+        with orm.db_session:
+            return cls(select_words(DiehlWord, ModelSource.Diehl, min_length, max_length, min_score),
+                       ModelSource.Diehl)
+
+    @classmethod
+    def from_compiled(cls, path: Path, mmap: bool = True):
+        """ Load a corpus compiled with Corpus.compile
+
+        The word index is memory-mapped, so that several processes share a single page-cached copy. Words are
+        created on access (as IndexedWord objects with word/score attributes).
+        """
+        logger.info(f"Loading compiled corpus {path} ...")
+        index = WordIndex.load(path, mmap=mmap)
+        corpus = cls(IndexWordList(index), ModelSource.Compiled)
+        corpus.index = index
+        corpus.compiled_path = path
+        return corpus
+
+    def compile(self, path: Path):
+        """ Write this corpus to a compiled binary file that can be loaded with Corpus.from_compiled
+
+        Only words made up entirely of the letters A-Z are kept.
+        """
+        if self.index is None:
+            self.build_index()
+        self.index.save(path, metadata=dict(source=self.model.name, n_words=len(self.index)))
 
     def to_n_letter_corpus(self, n: int):
         return self.to_subcorpus(n, n)
@@ -95,17 +248,66 @@ class Corpus(object):
         assert 3 <= m <= 22
         assert m >= n
 
-        return Corpus([w for w in self.word_list if n <= len(w.word) <= m], self.model)
-
-    def to_n_tries(self, n, padded=False):
+        by_length = {k: self.by_length[k] for k in range(n, m + 1) if k in self.by_length}
+        subcorpus = Corpus([w for words in by_length.values() for w in words], self.model)
+        subcorpus._by_length = by_length
+        return subcorpus
+
+    def content_hash(self) -> str:
+        """ SHA-1 digest of the indexed words (by length, in index order), identifying the corpus in on-disk caches
+        """
+        if self.index is None:
+            self.build_index()
+        digest = hashlib.sha1()
+        for length, bucket in sorted(self.index.buckets.items()):
+            if len(bucket):
+                digest.update(length.to_bytes(2, "little"))
+                digest.update(np.ascontiguousarray(bucket.letters).tobytes())
+        return digest.hexdigest()
+
+    def to_n_tries(self, n, padded=False, cache_dir: Union[None, Path] = None) -> List[ArrayTrie]:
+        """ Build an ArrayTrie of the (A-Z only) words of each length from 3 to n, from the word index
+
+        Tries are read-only, so each is only built (or loaded) once per corpus, and shared by every grid and fill.
+
+        Args:
+            n: longest word length
+            padded: prepend three Nones, so that the trie of length k words is at index k
+            cache_dir: directory to load the tries from (memory-mapped), or save them to, under the content hash of
+                the corpus (no caching if None)
+
+        Returns:
+            List of tries
+        """
         assert n >= 3
-        tries = [self.to_n_letter_corpus(i).to_trie() for i in range(3, n + 1)]
+        if self.index is None:
+            self.build_index()
+        trie_dir = None if cache_dir is None else Path(cache_dir) / f"tries_{self.content_hash()}"
+
+        tries = []
+        for length in range(3, n + 1):
+            if length not in self._tries:
+                if trie_dir is not None and ArrayTrie.exists(trie_dir, length):
+                    self._tries[length] = ArrayTrie.load(trie_dir, length)
+                else:
+                    self._tries[length] = ArrayTrie.from_letters(self.index[length].letters)
+                    if trie_dir is not None:
+                        self._tries[length].save(trie_dir)
+            tries.append(self._tries[length])
+
         if padded:
             return [None] * 3 + tries
         else:
             return tries
 
     def query(self, query_str: str) -> List[LaFargeWord]:
+        # Patterns made of letters and placeholders are answered from the letter index
+        letters_with_idxs = [(i, c.upper()) for i, c in enumerate(query_str) if c not in PLACEHOLDERS]
+        if all(letter_utils.is_only_letters(c) for _, c in letters_with_idxs):
+            if self.index is None:
+                self.build_index()
+            return [self.word_list[k] for k in self.index.match(len(query_str), letters_with_idxs)]
+
         # Replace placeholder {"?", "-", " "} with regular expression
         for p in PLACEHOLDERS:
             query_str = query_str.replace(p, AZRE_PATTERN)
@@ -120,14 +322,14 @@ class Corpus(object):
         # Return the list sorted alphebetically
         return sorted(matching, key=lambda w: score[self.model](w) or 0, reverse=True)
 
+    def build_index(self):
+        self.index = WordIndex.from_corpus(self)
+
     def build_trie(self):
         self.trie = self.to_trie()
 
     def to_trie(self) -> pygtrie.CharTrie:
-        t = pygtrie.CharTrie()
-        for lw in self.word_list:
-            t[lw.word] = True
-        return t
+        return words_to_trie(lw.word for lw in self.word_list)
 
     def subtree(self, prefix: str, as_corpus=True):
         if not self.trie:
@@ -139,14 +341,22 @@ class Corpus(object):
             return []
 
         if as_corpus:
+            lafarge_model.bind()
             return Corpus([w for w in LaFargeWord.select() if w.word in subree_words])
         else:
             return subree_words
 
     def str2laf(self, word: str):
+        lafarge_model.bind()
         return LaFargeWord.select(lambda w: w.word == word)
 
     def match(self, word_len: int, letters_with_idxs: List[Tuple[int, str]]):
+        if all(letter_utils.is_only_letters(c) for _, c in letters_with_idxs):
+            if self.index is None:
+                self.build_index()
+            letters_with_idxs = [(i, c.upper()) for i, c in letters_with_idxs]
+            return [self.word_list[k] for k in np.sort(self.index.match(word_len, letters_with_idxs))]
+
         word_list = []
         for w in self.word_list:
             if len(w.word) == word_len and all([w.word[i] == c for i, c in letters_with_idxs]):
@@ -1,11 +1,143 @@
-
-
 # Standard library imports
 import logging
+from pathlib import Path
+import sqlite3
 
 # Third-party imports
+from pony.orm import core as orm_core
 
 # Local imports
 
 
 logger = logging.getLogger(__name__)
+
+# SQLite connection settings for read-heavy work (e.g. loading corpora for the solver). These only last as long as the
+# connection: the journal mode is stored in the database file, so it is left to the writers. query_only is not set since
+# binding may still have to create the tables
+READ_PRAGMAS = dict(
+    mmap_size=256 * 1024 * 1024,
+    cache_size=-64 * 1024,  # Negative sizes are in KiB
+    temp_store="MEMORY",
+)
+
+# SQLite connection settings for bulk imports (which can simply be re-run if interrupted)
+WRITE_PRAGMAS = dict(
+    journal_mode="WAL",
+    synchronous="OFF",
+    cache_size=-256 * 1024,
+    temp_store="MEMORY",
+)
+
+
+# Stored word-length column of the word tables, filled in at ingestion so that corpora can be loaded by length range
+LENGTH_COLUMN = "length"
+
+
+def apply_pragmas(connection, pragmas: dict):
+    """ Run "PRAGMA name = value" on a DB-API connection for each item of pragmas
+    """
+    cursor = connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def add_length_columns(db, db_path: Path):
+    """ Add the stored word-length column to word tables created before it existed, filling it in from the words
+
+    Args:
+        db: pony.orm.Database (bound, but without a generated mapping)
+        db_path: path of its SQLite file
+    """
+    tables = [e._table_ or db.provider.get_default_entity_table_name(e)
+              for e in db.entities.values() if LENGTH_COLUMN in e._adict_]
+    if not tables or not Path(db_path).exists():
+        return
+
+    connection = sqlite3.connect(db_path)
+    try:
+        with connection:
+            for table in tables:
+                columns = [row[1] for row in connection.execute(f'PRAGMA table_info("{table}")')]
+                if columns and LENGTH_COLUMN not in columns:
+                    logger.info(f"Adding {LENGTH_COLUMN} column to {table} ({db_path})")
+                    connection.execute(f'ALTER TABLE "{table}" ADD COLUMN {LENGTH_COLUMN} INTEGER NOT NULL DEFAULT 0')
+                    connection.execute(f'UPDATE "{table}" SET {LENGTH_COLUMN} = LENGTH(word)')
+    finally:
+        connection.close()
+
+
+def remove_duplicate_keys(db, db_path: Path):
+    """ Delete the rows that repeat a composite key of their table (keeping the first), in tables created before the
+    key was declared, and add its unique index
+
+    Pony only declares the key when it creates a table, and fails on loading rows that repeat it. Tables that already
+    have the unique index are left alone.
+
+    Args:
+        db: pony.orm.Database (bound, but without a generated mapping)
+        db_path: path of its SQLite file
+    """
+    keys = [(e._table_ or db.provider.get_default_entity_table_name(e),
+             [c for a in key for c in ([a.column] if a.column else db.provider.get_default_column_names(a))])
+            for e in db.entities.values() for key in e._composite_keys_]
+    if not keys or not Path(db_path).exists():
+        return
+
+    connection = sqlite3.connect(db_path)
+    try:
+        with connection:
+            for table, columns in keys:
+                if not connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                          (table,)).fetchone():
+                    continue
+                unique_indexes = [row[1] for row in connection.execute(f'PRAGMA index_list("{table}")') if row[2]]
+                if any(sorted(row[2] for row in connection.execute(f'PRAGMA index_info("{index}")')) == sorted(columns)
+                       for index in unique_indexes):
+                    continue
+
+                column_list = ", ".join(f'"{c}"' for c in columns)
+                n_removed = connection.execute(f'DELETE FROM "{table}" WHERE rowid NOT IN '
+                                               f'(SELECT MIN(rowid) FROM "{table}" GROUP BY {column_list})').rowcount
+                if n_removed:
+                    logger.info(f"Removed {n_removed} rows of {table} with duplicate ({column_list}) ({db_path})")
+                index = f"unq_{table.lower()}__{'_'.join(columns)}"
+                connection.execute(f'CREATE UNIQUE INDEX "{index}" ON "{table}" ({column_list})')
+    finally:
+        connection.close()
+
+
+def bind_database(db, db_path: Path, create_tables: bool = True, pragmas: dict = None):
+    """ Bind a pony database to its SQLite file and generate its mapping
+
+    The data model modules only declare their entities; binding is deferred until a database is first used, so that
+    importing a model neither opens nor creates any files. Binding an already bound database is a no-op.
+
+    Pony cannot create tables from within a db_session, so when bound inside one, the tables are expected to exist.
+
+    Word tables from before the stored word-length column existed get it added (see add_length_columns), and tables
+    from before a composite key was declared have their duplicate rows removed (see remove_duplicate_keys).
+
+    Every connection pony opens is set up with the given pragmas (READ_PRAGMAS by default; WRITE_PRAGMAS suits the
+    word list imports).
+
+    Args:
+        db: pony.orm.Database to bind
+        db_path: path of the SQLite file
+        create_tables: create any missing tables and indexes (ignored inside a db_session)
+        pragmas: SQLite pragmas (name -> value) for each connection
+
+    Returns:
+        The bound database
+    """
+    if db.provider is None:
+        logger.debug(f"Binding database {db_path}")
+        connection_pragmas = READ_PRAGMAS if pragmas is None else pragmas
+        db.on_connect(provider="sqlite")(lambda _, connection: apply_pragmas(connection, connection_pragmas))
+        db.bind(provider="sqlite", filename=str(db_path), create_db=True)
+        add_length_columns(db, db_path)
+        remove_duplicate_keys(db, db_path)
+        if orm_core.local.db_session is None:
+            db.generate_mapping(create_tables=create_tables)
+        else:
+            db.generate_mapping(create_tables=False, check_tables=False)
+    return db
@@ -9,6 +9,7 @@ from pony import orm
 
 # Local imports
 import crosscosmos as xc
+from crosscosmos.data_models import bind_database
 
 
 logger = logging.getLogger(__name__)
@@ -16,16 +17,13 @@ logger = logging.getLogger(__name__)
 # collaborative-word-list database (see crosscosmos/wordlists/parse_collab_word_list.py)
 collab_word_list_db_path = xc.crosscosmos_project_root / "word_dbs" / "collab_word_list_words.sqlite"
 collab_word_list_word_db = orm.Database()
-collab_word_list_word_db.bind(
-    provider="sqlite",
-    filename=str(collab_word_list_db_path),
-    create_db=True,
-)
 
 
 class CollabWordListWord(collab_word_list_word_db.Entity):
     word = orm.PrimaryKey(str)
-    score = orm.Required(int)
+    score = orm.Required(int, index=True)
+    length = orm.Required(int, index=True)
 
 
-collab_word_list_word_db.generate_mapping(create_tables=True)
+def bind(create_tables: bool = True, pragmas: dict = None):
+    return bind_database(collab_word_list_word_db, collab_word_list_db_path, create_tables, pragmas)
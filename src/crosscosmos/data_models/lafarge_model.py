@@ -9,17 +9,13 @@ from pony import orm
 
 # Local imports
 import crosscosmos as xc
+from crosscosmos.data_models import bind_database
 
 logger = logging.getLogger(__name__)
 
 # xd database (see crosscosmos/wordlists/parse_xd.py)
 lafarge_db_path = xc.crosscosmos_project_root / "word_dbs" / "lafarge_words.sqlite"
 lafarge_word_db = orm.Database()
-lafarge_word_db.bind(
-    provider="sqlite",
-    filename=str(lafarge_db_path),
-    create_db=True,
-)
 
 
 class LaFargeClue(lafarge_word_db.Entity):
@@ -27,14 +23,16 @@ class LaFargeClue(lafarge_word_db.Entity):
     source: str = orm.Optional(str)  # nyt, wsj, etc.
     year: int = orm.Optional(int)
     word = orm.Required("LaFargeWord")
+    orm.composite_key(word, clue)
 
 
 class LaFargeWord(lafarge_word_db.Entity):
     word = orm.PrimaryKey(str)
+    length = orm.Required(int, index=True)
     clues = orm.Set("LaFargeClue")
     sources = orm.Required(orm.Json)
-    collab_score = orm.Optional(int)
-    diehl_score = orm.Optional(int)
+    collab_score = orm.Optional(int, index=True)
+    diehl_score = orm.Optional(int, index=True)
     xword_link = orm.Optional(str)
     notes = orm.Optional(str)
     is_word = orm.Optional(bool)
@@ -59,4 +57,6 @@ class LaFargeWord(lafarge_word_db.Entity):
 
 # LaFargeWord.__metaclass__ = LaFargeWordMeta
 
-lafarge_word_db.generate_mapping(create_tables=True)
+
+def bind(create_tables: bool = True, pragmas: dict = None):
+    return bind_database(lafarge_word_db, lafarge_db_path, create_tables, pragmas)
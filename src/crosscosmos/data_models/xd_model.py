@@ -9,17 +9,13 @@ from pony import orm
 
 # Local imports
 import crosscosmos as xc
+from crosscosmos.data_models import bind_database
 
 logger = logging.getLogger(__name__)
 
 # xd database (see crosscosmos/wordlists/parse_xd.py)
 xd_word_db_path = xc.crosscosmos_project_root / "word_dbs" / "xd_words.sqlite"
 xd_word_db = orm.Database()
-xd_word_db.bind(
-    provider="sqlite",
-    filename=xd_word_db,
-    create_db=True,
-)
 
 
 class XdWord(xd_word_db.Entity):
@@ -43,6 +39,8 @@ class XdWordUsage(xd_word_db.Entity):
     year = orm.Required("XdYear")
     word = orm.Required("XdWord")
     clue = orm.Required(str)
+    orm.composite_key(word, clue, pubid, year)  # Also indexes lookups by (word, clue)
 
 
-xd_word_db.generate_mapping(create_tables=True)
+def bind(create_tables: bool = True, pragmas: dict = None):
+    return bind_database(xd_word_db, xd_word_db_path, create_tables, pragmas)
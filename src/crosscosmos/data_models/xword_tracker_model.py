@@ -9,22 +9,20 @@ from pony import orm
 
 # Local imports
 import crosscosmos as xc
+from crosscosmos.data_models import bind_database
 
 logger = logging.getLogger(__name__)
 
 # Crossword tracker database (see crosscosmos/wordlists/scrape_crossword_tracker.py)
 xword_tracker_db_path = xc.crosscosmos_project_root / "word_dbs" / "crossword_tracker_words.sqlite"
 xword_tracker_word_db = orm.Database()
-xword_tracker_word_db.bind(
-    provider="sqlite",
-    filename=str(xword_tracker_db_path),
-    create_db=True,
-)
 
 
 class XwordWord(xword_tracker_word_db.Entity):
     word = orm.PrimaryKey(str)
     info = orm.Required(str)
+    length = orm.Required(int, index=True)
 
 
-xword_tracker_word_db.generate_mapping(create_tables=True)
+def bind(create_tables: bool = True, pragmas: dict = None):
+    return bind_database(xword_tracker_word_db, xword_tracker_db_path, create_tables, pragmas)
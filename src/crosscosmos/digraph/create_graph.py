@@ -11,6 +11,7 @@ from pony.orm import select, raw_sql
 # Local
 import crosscosmos as xc
 from crosscosmos.data_models.pydantic_model import Letter, Word
+from crosscosmos.data_models import lafarge_model
 from crosscosmos.data_models.lafarge_model import lafarge_word_db, LaFargeWord
 from crosscosmos.digraph.xgraph import LetterSet
 
@@ -18,6 +19,7 @@ logger = logging.getLogger("create_graph")
 logger.setLevel(logging.INFO)
 
 pony.options.CUT_TRACEBACK = False
+lafarge_model.bind()
 
 ls = LetterSet(3)
 xg = ls.create_graph()
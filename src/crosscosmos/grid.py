@@ -69,45 +69,190 @@ class GridStatus(Enum):
     INVALID = 3
 
 
-class Cell(object):
-    def __init__(self,
-                 x: int, y: int,
-                 status: CellStatus = CellStatus.EMPTY,
-                 value: str = "",
-                 gui_coordinates: Union[Tuple[float, float], None] = None,
-                 shuffle=True):
-        self.status = status
-        self.value = value
-        self.matrix_index = (x, y)
-        self.x = x
-        self.y = y
-        self.gui_coordinates = gui_coordinates
-        self.gui_row = None
-        self.gui_col = None
+# CellStatus lookup by its (array-stored) value
+CELL_STATUSES = tuple(sorted(CellStatus, key=lambda cs: cs.value))
+
+
+def word_runs(black: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ Locate the words along each row of a 2D array of black squares
+
+    Args:
+        black: 2D boolean array, true where a cell is BLACK
 
-        self.is_h_start = False
-        self.is_h_end = False
-        self.is_v_start = False
-        self.is_v_end = False
-        self.answer_number = None
+    Returns:
+        Three arrays shaped like the input: whether each cell starts a word, whether it ends a word,
+        and the length of the word it belongs to (0 for black squares)
+    """
+    white = ~black
 
-        self.hlen = 0
-        self.vlen = 0
+    prev_black = np.ones_like(black)
+    prev_black[:, 1:] = black[:, :-1]
+    next_black = np.ones_like(black)
+    next_black[:, :-1] = black[:, 1:]
 
-        # Keep track of any word that have been removed from consideration due to this cell
+    starts = white & prev_black
+    ends = white & next_black
+
+    # Label every cell with the running count of word starts, i.e. the id of the word it belongs to
+    run_ids = np.cumsum(starts.ravel()).reshape(black.shape)
+    run_lens = np.bincount(run_ids[white], minlength=int(run_ids.max()) + 1)
+    lengths = np.where(white, run_lens[run_ids], 0)
+    return starts, ends, lengths
+
+
+class CellSearchState(object):
+    """ Per-cell bookkeeping for the letter-by-letter solver (see crosscosmos.bot)
+    """
+    __slots__ = ("queue_order", "queue", "removed_words", "excluded")
+
+    def __init__(self, shuffle: bool = True):
+        # Keep track of any word (trie node and direction) that have been removed from consideration due to this cell
         self.removed_words = []
         self.excluded = []
 
         self.queue_order = list(reversed(string.ascii_uppercase))
         # self.queue = list(string.ascii_uppercase)
 
-        self.queue = copy.deepcopy(self.queue_order)
+        self.queue = list(self.queue_order)
         if shuffle:
             random.shuffle(self.queue)
 
+
+class Cell(object):
+    """ Lightweight view onto a single [x, y] entry of the arrays held by a Grid
+    """
+    __slots__ = ("parent", "x", "y")
+
+    def __init__(self, parent: "Grid", x: int, y: int):
+        self.parent = parent
+        self.x = x
+        self.y = y
+
     def __repr__(self):
         return f"Cell(val='{self.value}', loc={self.matrix_index})"
 
+    # Array-backed attributes ##############################################
+
+    @property
+    def matrix_index(self) -> Tuple[int, int]:
+        return self.x, self.y
+
+    @property
+    def status(self) -> CellStatus:
+        return CELL_STATUSES[self.parent.statuses[self.x, self.y]]
+
+    @status.setter
+    def status(self, status: CellStatus):
+        self.parent.statuses[self.x, self.y] = status.value
+
+    @property
+    def value(self) -> Union[str, None]:
+        code = self.parent.letters[self.x, self.y]
+        if code:
+            return chr(code)
+        return None if self.parent.statuses[self.x, self.y] == CellStatus.BLACK.value else ""
+
+    @value.setter
+    def value(self, value: Union[str, None]):
+        self.parent.letters[self.x, self.y] = ord(value) if value else 0
+
+    @property
+    def hlen(self) -> int:
+        return int(self.parent.hlens[self.x, self.y])
+
+    @hlen.setter
+    def hlen(self, hlen: int):
+        self.parent.hlens[self.x, self.y] = hlen
+
+    @property
+    def vlen(self) -> int:
+        return int(self.parent.vlens[self.x, self.y])
+
+    @vlen.setter
+    def vlen(self, vlen: int):
+        self.parent.vlens[self.x, self.y] = vlen
+
+    @property
+    def answer_number(self) -> Union[int, None]:
+        return int(self.parent.answer_numbers[self.x, self.y]) or None
+
+    @answer_number.setter
+    def answer_number(self, answer_number: Union[int, None]):
+        self.parent.answer_numbers[self.x, self.y] = answer_number or 0
+
+    @property
+    def is_h_start(self) -> bool:
+        return bool(self.parent.h_starts[self.x, self.y])
+
+    @property
+    def is_h_end(self) -> bool:
+        return bool(self.parent.h_ends[self.x, self.y])
+
+    @property
+    def is_v_start(self) -> bool:
+        return bool(self.parent.v_starts[self.x, self.y])
+
+    @property
+    def is_v_end(self) -> bool:
+        return bool(self.parent.v_ends[self.x, self.y])
+
+    @property
+    def gui_coordinates(self) -> Union[Tuple[float, float], None]:
+        x, y = self.parent.gui_coordinates[self.x, self.y]
+        return None if np.isnan(x) else (float(x), float(y))
+
+    @gui_coordinates.setter
+    def gui_coordinates(self, gui_coordinates: Union[Tuple[float, float], None]):
+        self.parent.gui_coordinates[self.x, self.y] = gui_coordinates or (np.nan, np.nan)
+
+    @property
+    def gui_row(self) -> Union[int, None]:
+        gui_row = self.parent.gui_rows[self.x, self.y]
+        return None if gui_row < 0 else int(gui_row)
+
+    @gui_row.setter
+    def gui_row(self, gui_row: Union[int, None]):
+        self.parent.gui_rows[self.x, self.y] = -1 if gui_row is None else gui_row
+
+    @property
+    def gui_col(self) -> Union[int, None]:
+        gui_col = self.parent.gui_cols[self.x, self.y]
+        return None if gui_col < 0 else int(gui_col)
+
+    @gui_col.setter
+    def gui_col(self, gui_col: Union[int, None]):
+        self.parent.gui_cols[self.x, self.y] = -1 if gui_col is None else gui_col
+
+    # Solver bookkeeping (created on first use) ############################
+
+    @property
+    def search_state(self) -> CellSearchState:
+        return self.parent.get_search_state(self.x, self.y)
+
+    @property
+    def queue(self) -> List[str]:
+        return self.search_state.queue
+
+    @queue.setter
+    def queue(self, queue: List[str]):
+        self.search_state.queue = queue
+
+    @property
+    def queue_order(self) -> List[str]:
+        return self.search_state.queue_order
+
+    @property
+    def removed_words(self) -> List[Tuple[int, WordDirection]]:
+        return self.search_state.removed_words
+
+    @removed_words.setter
+    def removed_words(self, removed_words: List[Tuple[int, WordDirection]]):
+        self.search_state.removed_words = removed_words
+
+    @property
+    def excluded(self) -> List[str]:
+        return self.search_state.excluded
+
     def to_json(self):
         return {
             'status': self.status.value,
@@ -128,22 +273,17 @@ class Cell(object):
         }
 
     @classmethod
-    def from_dict(cls, json_cell: dict):
-        cell = cls(x=json_cell['x'],
-                   y=json_cell['y'],
-                   status=CellStatus(json_cell['status']),
-                   value=json_cell['value'],
-                   gui_coordinates=json_cell['gui_coordinates'])
-        cell.matrix_index = json_cell['matrix_index']
+    def from_dict(cls, json_cell: dict, parent: "Grid"):
+        """ Write a saved cell into its location in the parent grid
+
+        Derived data (word boundaries, lengths and answer numbers) is recomputed by the grid.
+        """
+        cell = cls(parent, json_cell['x'], json_cell['y'])
+        cell.status = CellStatus(json_cell['status'])
+        cell.value = json_cell['value']
+        cell.gui_coordinates = json_cell['gui_coordinates']
         cell.gui_row = json_cell['gui_row']
         cell.gui_col = json_cell['gui_col']
-        cell.is_h_start = json_cell['is_h_start']
-        cell.is_h_end = json_cell['is_h_end']
-        cell.is_v_start = json_cell['is_v_start']
-        cell.is_v_end = json_cell['is_v_end']
-        cell.answer_number = json_cell['answer_number']
-        cell.hlen = json_cell['hlen']
-        cell.vlen = json_cell['vlen']
         return cell
 
     @classmethod
@@ -182,7 +322,8 @@ class Cell(object):
         elif value is None:
             self.status = CellStatus.BLACK
             self.value = None
-        elif isinstance(value, str) and len(value) == 1:
+        elif isinstance(value, str) and len(value.upper()) == 1 and value.upper() in string.ascii_uppercase:
+            # Only A-Z can be part of a fill (and some letters, like "ß", uppercase to more than one character)
             self.status = CellStatus.SET
             self.value = value.upper()
         else:
@@ -196,23 +337,25 @@ class Cell(object):
         self.excluded.append(self.value)
         self.status = CellStatus.EMPTY
         self.value = ""
-        self.queue = copy.deepcopy(self.queue_order)
+        self.queue = list(self.queue_order)
 
         # Return the word (if any) that is now valid again
         removed_words = self.removed_words
         self.removed_words = []
         return removed_words
 
-    def remove_word(self, word: str, direction: WordDirection):
-        self.removed_words.append((word, direction))
+    def remove_word(self, node: int, direction: WordDirection):
+        self.removed_words.append((node, direction))
 
 
 class CellList(object):
 
-    def __init__(self, cells: List[Cell]):
+    def __init__(self, cells: List[Cell], direction: WordDirection = None):
         self.cells = cells
 
-        if self.cells[1].y > self.cells[0].y:
+        if len(self.cells) < 2:
+            self.direction = direction
+        elif self.cells[1].y > self.cells[0].y:
             self.direction = WordDirection.HORIZONTAL
         else:
             self.direction = WordDirection.VERTICAL
@@ -240,9 +383,42 @@ class CellList(object):
         return "-" in str(self)
 
 
+class GridSlot(object):
+    """ A single entry (across or down) of a grid: a maximal run of white cells along a row or column
+    """
+    __slots__ = ("id", "direction", "start", "length", "cells")
+
+    def __init__(self, slot_id: int, direction: WordDirection, i: int, j: int, length: int):
+        self.id = slot_id
+        self.direction = direction
+        self.start = (i, j)
+        self.length = length
+
+        match direction:
+            case WordDirection.HORIZONTAL:
+                self.cells = [(i, j + k) for k in range(length)]
+            case WordDirection.VERTICAL:
+                self.cells = [(i + k, j) for k in range(length)]
+            case _:
+                raise ValueError("Invalid word direction")
+
+    def __repr__(self):
+        return f"GridSlot(id={self.id}, start={self.start}, len={self.length}, dir={self.direction})"
+
+
+# Compact grid file format (see Grid.to_compact). Version 1 is the verbose per-cell format of Grid.to_json
+GRID_FORMAT = "crosscosmos-grid"
+GRID_FORMAT_VERSION = 2
+BLACK_CHAR = "#"
+EMPTY_CHAR = "."
+
+# Axis of Grid.cell_slots/Grid.cell_offsets for each direction
+SLOT_AXIS = {WordDirection.HORIZONTAL: 0, WordDirection.VERTICAL: 1}
+
+
 class Grid(object):
 
-    def __init__(self, grid_size: Tuple[int, int], corpus: xc.corpus.Corpus = None, shuffle: bool = True,
+    def __init__(self, grid_size: Tuple[int, int], corpus: "xc.corpus.Corpus" = None, shuffle: bool = True,
                  symmetry: GridSymmetry = GridSymmetry.ROTATIONAL, auto_symmetry: bool = False,
                  save_path: Union[None, Path] = None):
 
@@ -260,16 +436,43 @@ class Grid(object):
         self.v_heads = []
 
         self.corpus = corpus
-
-        # Fill out grid/center
-        self.grid = np.empty(self.grid_size, dtype=Cell)
+        self.shuffle = shuffle
+
+        # Grid state
+        self.statuses = np.full(self.grid_size, CellStatus.EMPTY.value, dtype=np.uint8)
+        self.letters = np.zeros(self.grid_size, dtype=np.uint8)  # Character codes (0 if no letter)
+        self.hlens = np.zeros(self.grid_size, dtype=np.int16)
+        self.vlens = np.zeros(self.grid_size, dtype=np.int16)
+        self.answer_numbers = np.zeros(self.grid_size, dtype=np.int16)  # 0 if unnumbered
+        self.h_starts = np.zeros(self.grid_size, dtype=bool)
+        self.h_ends = np.zeros(self.grid_size, dtype=bool)
+        self.v_starts = np.zeros(self.grid_size, dtype=bool)
+        self.v_ends = np.zeros(self.grid_size, dtype=bool)
+
+        # GUI locations of each cell
+        self.gui_coordinates = np.full((*self.grid_size, 2), np.nan)
+        self.gui_rows = np.full(self.grid_size, -1, dtype=np.int16)
+        self.gui_cols = np.full(self.grid_size, -1, dtype=np.int16)
+
+        # Letter-by-letter solver bookkeeping, keyed by cell index (see CellSearchState)
+        self.search_states = {}
+
+        # Cell views (see Grid.grid), created on first access
+        self._cells = None
+
+        # Results of is_valid_with_black by (x, y, symmetry, auto_symmetry), cleared whenever the black squares change
+        self._black_validity = {}
+
+        # Slot table (see Grid.slots), rebuilt on first use after the black squares change
+        self._slots = None
+        self._cell_slots = None
+        self._cell_offsets = None
+
+        # Candidate counts for count_possible, keyed by (slot, pattern), for a given corpus
+        self._pattern_counts = {}
+        self._pattern_counts_corpus = None
         self.center = [((self.grid_size[0] - 1) / 2), ((self.grid_size[1] - 1) / 2)]
 
-        # Fill out grid
-        for i in range(self.row_count):
-            for j in range(self.col_count):
-                self.grid[i, j] = Cell(x=i, y=j, shuffle=shuffle)
-
         # Update the heads for horizontal and vertical clues
         self.update_length_and_head_data()
 
@@ -278,9 +481,44 @@ class Grid(object):
         self.save_path = save_path
         self.tries = []
 
+    STATE_ARRAYS = ("statuses", "letters", "hlens", "vlens", "answer_numbers",
+                    "h_starts", "h_ends", "v_starts", "v_ends",
+                    "gui_coordinates", "gui_rows", "gui_cols")
+
     def __repr__(self):
         return f"Grid(dim=({self.grid_size[0]}, {self.grid_size[1]})"
 
+    @property
+    def grid(self) -> np.ndarray:
+        """ 2D array of Cell views onto the grid state
+        """
+        if self._cells is None:
+            self._cells = np.empty(self.grid_size, dtype=object)
+            for i in range(self.row_count):
+                for j in range(self.col_count):
+                    self._cells[i, j] = Cell(self, i, j)
+        return self._cells
+
+    def get_search_state(self, i: int, j: int) -> CellSearchState:
+        state = self.search_states.get((i, j))
+        if state is None:
+            state = CellSearchState(shuffle=self.shuffle)
+            self.search_states[(i, j)] = state
+        return state
+
+    def copy(self):
+        """ Copy the grid state (the corpus and tries are shared with this grid)
+        """
+        new_grid = copy.copy(self)
+        for name in self.STATE_ARRAYS:
+            setattr(new_grid, name, getattr(self, name).copy())
+        new_grid.h_heads = list(self.h_heads)
+        new_grid.v_heads = list(self.v_heads)
+        new_grid.search_states = copy.deepcopy(self.search_states)
+        new_grid._cells = None
+        new_grid._black_validity = {}
+        return new_grid
+
     def __getitem__(self, x: Tuple[int, int]) -> Cell:
         # Check index
         if (x[0] < 0 or x[0] > self.grid_size[0]) or (x[1] < 0 or x[1] > self.grid_size[1]):
@@ -293,14 +531,42 @@ class Grid(object):
 
     @classmethod
     def from_dict(cls, json_grid: dict):
+        """ Create a grid from its compact (Grid.to_compact) or verbose (Grid.to_json) representation
+        """
+        if json_grid.get('format') == GRID_FORMAT:
+            return cls.from_compact(json_grid)
+
         grid = cls(json_grid['grid_size'])
         grid.symmetry = GridSymmetry(json_grid['symmetry'])
         grid.auto_symmetry = json_grid['auto_symmetry']
         if 'grid_letters' in json_grid:
-            grid_letters = json_grid['grid_letters']
-            for i in range(grid.row_count):
-                for j in range(grid.col_count):
-                    grid.grid[i, j] = Cell.from_dict(grid_letters[i][j])
+            for row in json_grid['grid_letters']:
+                for json_cell in row:
+                    Cell.from_dict(json_cell, grid)
+
+        grid.update_length_and_head_data()
+        return grid
+
+    @classmethod
+    def from_compact(cls, compact: dict):
+        """ Create a grid from its compact representation (see Grid.to_compact)
+        """
+        if compact['version'] > GRID_FORMAT_VERSION:
+            raise ValueError(f"Unsupported grid format version {compact['version']} "
+                             f"(up to {GRID_FORMAT_VERSION} is supported)")
+
+        grid = cls(tuple(compact['grid_size']))
+        grid.symmetry = GridSymmetry(compact['symmetry'])
+        grid.auto_symmetry = compact['auto_symmetry']
+
+        chars = np.frombuffer("".join(compact['rows']).encode("latin-1"), dtype=np.uint8).reshape(grid.grid_size)
+        black = chars == ord(BLACK_CHAR)
+        empty = chars == ord(EMPTY_CHAR)
+        grid.statuses[...] = np.where(black, CellStatus.BLACK.value,
+                                      np.where(empty, CellStatus.EMPTY.value, CellStatus.SET.value))
+        grid.letters[...] = np.where(black | empty, 0, chars)
+        if compact['locked']:
+            grid.statuses[tuple(np.array(compact['locked']).T)] = CellStatus.LOCKED.value
 
         grid.update_length_and_head_data()
         return grid
@@ -313,7 +579,44 @@ class Grid(object):
 
     @property
     def is_valid(self):
-        return all([c.is_valid for c in self.grid.flatten()])
+        return bool(np.all((self.statuses == CellStatus.BLACK.value) | ((self.hlens >= 3) & (self.vlens >= 3))))
+
+    def is_valid_with_black(self, x: int, y: int) -> bool:
+        """ Whether the grid would be valid if the cell at [x, y] were set to BLACK (along with its symmetric partner,
+        as set_grid would do)
+
+        Only the rows/columns through the affected cells are re-evaluated, and the grid is left untouched.
+        """
+        # The symmetric partner depends on the symmetry settings, which can change without the black squares changing
+        key = (x, y, self.symmetry, self.auto_symmetry)
+        if key in self._black_validity:
+            return self._black_validity[key]
+
+        cells = [(x, y)]
+        if self.auto_symmetry and self.symmetry == GridSymmetry.ROTATIONAL:
+            cells.append(self.get_symmetric_index(x, y, self.symmetry))
+        rows = sorted({i for i, _ in cells})
+        cols = sorted({j for _, j in cells})
+
+        black = self.statuses == CellStatus.BLACK.value
+        rows_ok = np.all(black | (self.hlens >= 3), axis=1)
+        cols_ok = np.all(black | (self.vlens >= 3), axis=0)
+        rows_ok[rows] = True
+        cols_ok[cols] = True
+
+        # Lengths of the affected rows/columns with the new black squares
+        new_black_rows = black[rows]
+        new_black_cols = black[:, cols].T
+        for i, j in cells:
+            new_black_rows[rows.index(i), j] = True
+            new_black_cols[cols.index(j), i] = True
+        _, _, hlens = word_runs(new_black_rows)
+        _, _, vlens = word_runs(new_black_cols)
+
+        is_valid = bool(rows_ok.all() and cols_ok.all() and
+                        np.all(new_black_rows | (hlens >= 3)) and np.all(new_black_cols | (vlens >= 3)))
+        self._black_validity[key] = is_valid
+        return is_valid
 
     # Saving ###############################################################
 
@@ -330,97 +633,227 @@ class Grid(object):
             auto_symmetry=self.auto_symmetry
         )
 
+    def to_compact(self) -> dict:
+        """ Compact, versioned representation of the grid
+
+        Each row is a string with a character per cell: the letter, BLACK_CHAR for a black square, or EMPTY_CHAR for
+        an empty cell; locked cells are listed separately. Derived data (word boundaries, lengths, answer numbers) and
+        GUI locations are left out, and rebuilt on load.
+        """
+        black = self.statuses == CellStatus.BLACK.value
+        empty = (self.statuses == CellStatus.EMPTY.value) | (self.letters == 0)
+        if np.any(np.isin(self.letters[~black & ~empty], [ord(BLACK_CHAR), ord(EMPTY_CHAR)])):
+            raise ValueError(f"Letters '{BLACK_CHAR}' and '{EMPTY_CHAR}' cannot be saved in the compact format")
+
+        chars = np.where(black, ord(BLACK_CHAR), np.where(empty, ord(EMPTY_CHAR), self.letters)).astype(np.uint8)
+        return dict(
+            format=GRID_FORMAT,
+            version=GRID_FORMAT_VERSION,
+            grid_size=list(self.grid_size),
+            symmetry=self.symmetry.value,
+            auto_symmetry=self.auto_symmetry,
+            rows=[row.tobytes().decode("latin-1") for row in chars],
+            locked=np.argwhere(self.statuses == CellStatus.LOCKED.value).tolist(),
+        )
+
     def count_possible(self,
                        query_cells: Union[CellList, List[Tuple[Cell, WordDirection]]],
                        grid_status: GridStatus = GridStatus.INCOMPLETE,
                        query_level: int = 2,
                        corpus=None) -> int:
-        """ Count the number of configurations by varying a set of cell
+        """ Count the number of configurations by varying a set of cells
+
+        For each query cell, the entry through it (across its direction) is matched against the corpus, and its number
+        of candidates is added to the count (entries that are already full are skipped). With query_level > 1, each
+        candidate is then placed in turn, and the counts for the entries crossing it are added, one level down. Any
+        entry without candidates makes the count 0.
+
+        Candidates are placed virtually (the grid is never modified), counts come from the corpus word index, and
+        they are memoized by (slot, pattern), so repeated calls on the same grid only pay for new patterns.
 
         Args:
-            query_cells:
-            grid_status:
-            query_level:
-            corpus:
+            query_cells: a CellList (whose cells take the list's direction), or a list of (cell, direction) pairs
+            grid_status: unused
+            query_level: number of entries to look ahead
+            corpus: corpus to count from (defaults to self.corpus)
 
         Returns:
-
+            Number of possible entries
         """
+        if not corpus:
+            corpus = self.corpus
+        if corpus.index is None:
+            corpus.build_index()
+        if self._pattern_counts_corpus is not corpus:
+            self._pattern_counts = {}
+            self._pattern_counts_corpus = corpus
+
+        if hasattr(query_cells, 'direction'):
+            query_cells = [((c.x, c.y), query_cells.direction) for c in query_cells]
+        else:
+            query_cells = [((c.x, c.y), direction) for c, direction in query_cells]
 
-        # Setup loop --------------------------------------------------------------------------------------------------#
+        return self._count_possible(query_cells, {}, query_level, corpus)
 
-        # End case for recursion
+    def _count_possible(self, query_cells, placed: dict, query_level: int, corpus) -> int:
+        """ count_possible, with the letters of the candidates placed so far given by placed[(i, j)]
+        """
         if query_level == 0:
             return 0
 
-        # To override corpus
-        if not corpus:
-            corpus = self.corpus
-
-        # Count the number of entries given the candidate word
         n_possible = 0
-
-        # Check through each of the query cells -----------------------------------------------------------------------#
-        for qc in query_cells:
-
-            # Get the cell/direction
-            if hasattr(query_cells, 'direction'):
-                cell = qc
-                original_direction = query_cells.direction
-            else:
-                cell, original_direction = qc
-
-            # Get the cells starting at {cell} in flip({direction})
+        for (x, y), original_direction in query_cells:
             query_direction = WordDirection.flip(original_direction)
-            query_cell_list = self.full_word_from_cell(cell.x,
-                                                       cell.y,
-                                                       query_direction,
-                                                       terminate_on_empty=False)
-
-            # Get the list of cells for the next level
-            next_level_cells = []
-            for c in query_cell_list:
-                possible_next_cells = self.full_word_from_cell(c.x,
-                                                               c.y,
-                                                               query_direction,
-                                                               terminate_on_empty=False)
-                next_level_cells.extend(
-                    [(next_cell, query_direction) for next_cell in possible_next_cells
-                     if next_cell.is_start(query_direction)]
-                )
-            next_level_cells = list(set(next_level_cells))
+            cells = self._slot_cells(x, y, query_direction)
+
+            pattern = "".join([placed[ij] if ij in placed else chr(self.letters[ij]) if self.letters[ij] else "-"
+                               for ij in cells])
 
             # No information available here
-            if not query_cell_list.has_empty_cell():
+            if "-" not in pattern:
                 continue
 
-            # Get the possible words
-            c_candidate_words = xc.query.match(corpus, str(query_cell_list))
+            key = (cells[0], query_direction, pattern)
+            if key not in self._pattern_counts:
+                self._pattern_counts[key] = len(self._pattern_candidates(pattern, corpus))
+            n_candidates = self._pattern_counts[key]
 
-            # Recursively check other directions ---------------------------------------#
-            head_cell = query_cell_list[0]
-            for candidate_word in c_candidate_words:
-                # Set the word (temporary)
-                self.set_word(candidate_word.word, head_cell.x, head_cell.y, query_direction)
+            # Short circuit if we have reached an impossible grid configuration
+            if n_candidates == 0:
+                return 0
+            n_possible += n_candidates
+
+            # Recursively check the crossing entries for each candidate
+            if query_level == 2 and self._is_indexed(pattern):
+                n_possible += self._count_crossings(cells, query_direction, pattern, placed, corpus)
+            elif query_level > 1:
+                next_level_cells = [(ij, query_direction) for ij in cells]
+                for candidate_word in self._pattern_candidates(pattern, corpus):
+                    next_placed = dict(placed)
+                    next_placed.update(zip(cells, candidate_word))
+                    n_possible += self._count_possible(next_level_cells, next_placed, query_level - 1, corpus)
 
-                # Recursive call to increment the number of possible words in next direction
-                n_possible += self.count_possible(next_level_cells,
-                                                  grid_status,
-                                                  query_level - 1)
+        return n_possible
 
-                # Reset values
-                self.set_word(str(query_cell_list), head_cell.x, head_cell.y, query_direction)
+    def _count_crossings(self, cells: List[Tuple[int, int]], direction: WordDirection, pattern: str, placed: dict,
+                         corpus) -> int:
+        """ Last level of count_possible: the sum, over every candidate for a slot, of the counts for its crossings
 
-            # Add to the possibilities if we're at the bottom query level
-            n_possible += len(c_candidate_words)
+        The count for a crossing only depends on the letter the candidate puts in it, so it is looked up for each of
+        the 26 letters once, and the candidates are then summed up as arrays.
+        """
+        bucket = corpus.index[len(pattern)]
+        candidates = bucket.letters[bucket.match([(k, c) for k, c in enumerate(pattern) if c != "-"])]
+        crossing_direction = WordDirection.flip(direction)
+
+        totals = np.zeros(len(candidates), dtype=np.int64)
+        dead = np.zeros(len(candidates), dtype=bool)
+        for k, ij in enumerate(cells):
+            crossing = self._slot_cells(*ij, crossing_direction)
+
+            # Counts for the crossing with each letter at the shared cell
+            counts = np.zeros(26, dtype=np.int64)
+            for letter in np.unique(candidates[:, k]).tolist():
+                crossing_pattern = "".join([chr(letter + 65) if ij_c == ij else
+                                            placed[ij_c] if ij_c in placed else
+                                            chr(self.letters[ij_c]) if self.letters[ij_c] else "-"
+                                            for ij_c in crossing])
+                if "-" not in crossing_pattern:
+                    counts[letter] = -1  # Full entries are skipped
+                    continue
+
+                key = (crossing[0], crossing_direction, crossing_pattern)
+                if key not in self._pattern_counts:
+                    self._pattern_counts[key] = len(self._pattern_candidates(crossing_pattern, corpus))
+                counts[letter] = self._pattern_counts[key]
+
+            crossing_counts = counts[candidates[:, k]]
+            dead |= crossing_counts == 0
+            totals += np.maximum(crossing_counts, 0)
+
+        return int(totals[~dead].sum())
 
-            # Short circuit if we have reached an impossible grid configuration
-            if len(c_candidate_words) == 0:
-                return 0
+    @staticmethod
+    def _is_indexed(pattern: str) -> bool:
+        """ Whether a pattern can be looked up in the corpus word index (letters A-Z only)
+        """
+        return all("A" <= c <= "Z" for c in pattern if c != "-")
 
-        return n_possible
+    def _pattern_candidates(self, pattern: str, corpus) -> List[str]:
+        """ Words matching a pattern ("-" for an open cell), read from the corpus word index where possible
+        """
+        if self._is_indexed(pattern):
+            bucket = corpus.index[len(pattern)]
+            return [bucket.words[k] for k in bucket.match([(k, c) for k, c in enumerate(pattern) if c != "-"])]
+        return [w.word for w in corpus.query(pattern)]
+
+    def _slot_cells(self, x: int, y: int, direction: WordDirection) -> List[Tuple[int, int]]:
+        """ Indices of the cells of the entry through [x, y] (empty if the cell is black)
+        """
+        slot = self.slot_at(x, y, direction)
+        return slot.cells if slot is not None else []
+
+    # Slot table ###############################################################
+
+    @property
+    def slots(self) -> List[GridSlot]:
+        """ Every entry of the grid (across entries in row-major order of their heads, then down entries), including
+        runs of a single cell
+
+        The table only depends on the black squares, so it is built on first use and kept until they change.
+        """
+        if self._slots is None:
+            self._build_slot_table()
+        return self._slots
 
-    def save(self, file_path: Union[None, Path] = None):
+    @property
+    def cell_slots(self) -> np.ndarray:
+        """ (rows x cols x 2) id of the across (index 0) and down (index 1) slot through each cell (-1 if black)
+        """
+        if self._slots is None:
+            self._build_slot_table()
+        return self._cell_slots
+
+    @property
+    def cell_offsets(self) -> np.ndarray:
+        """ (rows x cols x 2) position of each cell within its across (index 0) and down (index 1) slot (-1 if black)
+        """
+        if self._slots is None:
+            self._build_slot_table()
+        return self._cell_offsets
+
+    def _build_slot_table(self):
+        slots = []
+        cell_slots = np.full((*self.grid_size, 2), -1, dtype=np.int32)
+        cell_offsets = np.full((*self.grid_size, 2), -1, dtype=np.int32)
+        for direction, heads, lengths in ((WordDirection.HORIZONTAL, self.h_heads, self.hlens),
+                                          (WordDirection.VERTICAL, self.v_heads, self.vlens)):
+            axis = SLOT_AXIS[direction]
+            for i, j in heads:
+                slot = GridSlot(len(slots), direction, i, j, int(lengths[i, j]))
+                rows, cols = zip(*slot.cells)
+                cell_slots[rows, cols, axis] = slot.id
+                cell_offsets[rows, cols, axis] = np.arange(slot.length)
+                slots.append(slot)
+
+        # Grids copied from this one share the table, so it is replaced rather than modified
+        self._slots = slots
+        self._cell_slots = cell_slots
+        self._cell_offsets = cell_offsets
+
+    def slot_at(self, i: int, j: int, direction: WordDirection) -> Union[GridSlot, None]:
+        """ The entry through [i, j] in the given direction (None if the cell is black)
+        """
+        k = self.cell_slots[i, j, SLOT_AXIS[direction]]
+        return self._slots[k] if k >= 0 else None
+
+    def save(self, file_path: Union[None, Path] = None, verbose: bool = False):
+        """ Save the grid as JSON (to file_path, or else to the path it was loaded from)
+
+        Args:
+            file_path: file to save to
+            verbose: write the verbose per-cell format (Grid.to_json) instead of the compact one (Grid.to_compact)
+        """
         if file_path:
             save_path = file_path
         elif self.save_path:
@@ -428,7 +861,7 @@ class Grid(object):
         else:
             raise RuntimeError("Save path undefined")
 
-        xc.io_utils.save_json_dict(save_path, self.to_json())
+        xc.io_utils.save_json_dict(save_path, self.to_json() if verbose else self.to_compact())
 
     def get_symmetric_index(self, x: int, y: int, symmetry: GridSymmetry):
         if symmetry == GridSymmetry.ROTATIONAL:
@@ -436,13 +869,19 @@ class Grid(object):
             coord_rot_center = -coord_center[0], -coord_center[1]
             return self.center2corner(*coord_rot_center)
 
-    def build_tries(self, n: int = None):
+    def build_tries(self, n: int = None, cache_dir: Union[None, Path] = None):
+        """ Build the tries of the corpus words by length (see Corpus.to_n_tries)
+
+        Args:
+            n: longest word length (defaults to the longest dimension of the grid, plus one)
+            cache_dir: directory of the on-disk trie cache (no caching if None)
+        """
         if self.corpus:
             if n:
                 trie_len = n
             else:
                 trie_len = max(self.row_count, self.col_count) + 1
-            self.tries = self.corpus.to_n_tries(trie_len, padded=True)
+            self.tries = self.corpus.to_n_tries(trie_len, padded=True, cache_dir=cache_dir)
         else:
             logger.warning("Could not build tries (no corpus loaded)")
 
@@ -456,6 +895,12 @@ class Grid(object):
         if (x < 0 or x > self.grid_size[0]) or (y < 0 or y > self.grid_size[1]):
             raise IndexError(f"Index outside grid bounds:({self.grid_size[0]}, {self.grid_size[1]})")
 
+        # Black squares before the update (only a change in these affects word boundaries)
+        indices = [(x, y)]
+        if self.symmetry != GridSymmetry.NONE:
+            indices.append(self.get_symmetric_index(x, y, self.symmetry))
+        was_black = [self.grid[i][j].status == CellStatus.BLACK for i, j in indices]
+
         # Set value
         self.grid[x][y].update(value)
 
@@ -473,54 +918,48 @@ class Grid(object):
                     # Set the rotated state to black
                     self.grid[cr1][cr2].update(None)
 
-        # Update heads
-        self.update_length_and_head_data()
+        # Update heads (only where the black squares changed)
+        changed = [(i, j) for (i, j), b in zip(indices, was_black) if (self.grid[i][j].status == CellStatus.BLACK) != b]
+        if changed:
+            self.update_length_and_head_data(changed)
 
-    def update_length_and_head_data(self):
+    def update_length_and_head_data(self, changed: List[Tuple[int, int]] = None):
         """ Compute/save word lengths, and which squares are origins
-        """
-
-        # Update horizontal / vertical heads
-        self.h_heads = []
-        self.v_heads = []
-        answer_counter = 1
-        for i in range(self.row_count):
-            for j in range(self.col_count):
 
-                # Update lists of head nodes
-                is_h_start = self.is_h_start(i, j)
-                is_v_start = self.is_v_start(i, j)
-
-                if is_h_start:
-                    self.h_heads.append((i, j))
+        Args:
+            changed: cells whose BLACK status has changed. If given, only the rows/columns through these cells are
+                recomputed; otherwise the entire grid is.
+        """
+        black = self.statuses == CellStatus.BLACK.value
+        if changed is None:
+            rows = slice(None)
+            cols = slice(None)
+        else:
+            rows = sorted({i for i, _ in changed})
+            cols = sorted({j for _, j in changed})
+        self._black_validity = {}
 
-                if is_v_start:
-                    self.v_heads.append((i, j))
+        self.h_starts[rows], self.h_ends[rows], self.hlens[rows] = word_runs(black[rows])
 
-                if is_h_start or is_v_start:
-                    self[i, j].answer_number = answer_counter
-                    answer_counter += 1
-                else:
-                    self[i, j].answer_number = None
+        v_starts, v_ends, vlens = word_runs(black[:, cols].T)
+        self.v_starts[:, cols], self.v_ends[:, cols], self.vlens[:, cols] = v_starts.T, v_ends.T, vlens.T
 
-                # Update start/end data
-                self[i, j].is_h_start = self.is_h_start(i, j)
-                self[i, j].is_h_end = self.is_h_end(i, j)
-                self[i, j].is_v_start = self.is_v_start(i, j)
-                self[i, j].is_v_end = self.is_v_end(i, j)
+        self.update_answer_numbers()
+        self._slots = None
 
-        # Update word lengths
-        for i in range(self.row_count):
-            for j in range(self.col_count):
-                self[i, j].hlen = self.horizontal_word_len(i, j)
-                self[i, j].vlen = self.vertical_word_len(i, j)
+    def update_answer_numbers(self):
+        """ Rebuild the lists of horizontal/vertical heads and the answer numbers from the start flags
+        """
+        numbered = self.h_starts | self.v_starts
+        self.answer_numbers[...] = np.where(numbered, np.cumsum(numbered.ravel()).reshape(numbered.shape), 0)
+        self.h_heads = [tuple(ij) for ij in np.argwhere(self.h_starts).tolist()]
+        self.v_heads = [tuple(ij) for ij in np.argwhere(self.v_starts).tolist()]
 
     def clear(self):
         """ Reset all values in the grid, except those that are locked or black
         """
-        for c in self.grid.flatten():
-            if c.status == CellStatus.SET:
-                c.reset_cell()
+        for i, j in np.argwhere(self.statuses == CellStatus.SET.value).tolist():
+            self[i, j].reset_cell()
 
     def lock_entry(self, i: int, j: int):
         """ Lock the cell at [i, j]
@@ -720,7 +1159,12 @@ class Grid(object):
         start_cell = self[x, y]
 
         if start_cell.status == CellStatus.BLACK:
-            return CellList([])
+            return CellList([], direction)
+
+        if not terminate_on_empty:
+            if direction not in SLOT_AXIS:
+                raise ValueError("Invalid direction")
+            return CellList([self.grid[ij] for ij in self.slot_at(x, y, direction).cells], direction)
 
         match direction:
             case direction.VERTICAL:
@@ -737,7 +1181,7 @@ class Grid(object):
         ))
         end_cells = self.aggregate_cells(x, y, pos_traverse_dir, terminate_on_empty)[1:]
         cells = start_cells + [start_cell] + end_cells
-        return CellList(cells)
+        return CellList(cells, direction)
 
     def aggregate_cells(self, i: int, j: int,
                         which: GridDirection,
@@ -782,7 +1226,8 @@ class Grid(object):
         return cells
 
     def word_len(self, i: int, j: int, direction: WordDirection):
-        return len(self.full_word_from_cell(i, j, direction))
+        slot = self.slot_at(i, j, direction)
+        return slot.length if slot is not None else 0
 
     def horizontal_word_len(self, i: int, j: int):
         return self.word_len(i, j, WordDirection.HORIZONTAL)
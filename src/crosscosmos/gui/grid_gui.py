@@ -198,7 +198,7 @@ class CrossCosmosGame(arcade.Window):
         @bot_button.event("on_click")
         def on_click_bot_button(event):
             self.grid.clear()
-            bot.solve(self.grid)
+            bot.solve(self.grid, mode=bot.SolveMode.SLOT)
             self.sync_gui_grid()
             self.grid.save()
 
@@ -455,9 +455,8 @@ class CrossCosmosGame(arcade.Window):
             return
 
         # Set the color
-        temp_grid = xc.grid.Grid.from_dict(self.grid.to_json())
-        temp_grid.set_grid(grid_row, grid_col, None)
-        highlight_color = BLACK_VALID_HIGHLIGHT_COLOR if temp_grid.is_valid else BLACK_INVALID_HIGHLIGHT_COLOR
+        is_valid = self.grid.is_valid_with_black(grid_row, grid_col)
+        highlight_color = BLACK_VALID_HIGHLIGHT_COLOR if is_valid else BLACK_INVALID_HIGHLIGHT_COLOR
         if not is_highlighted:
             self.sync_gui_grid()
             sprite.color = highlight_color
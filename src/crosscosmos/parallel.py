@@ -0,0 +1,202 @@
+""" Multi-process grid filling
+
+Several SlotSolver workers search the same grid at once, each with its own random seed (and so its own value ordering).
+Fill times on hard grids are heavy-tailed across seeds, so racing N differently-seeded searches cuts the time to the
+first fill roughly with the number of cores.
+
+Workers share the read-only corpus: on platforms that fork, it is inherited copy-on-write from the parent process;
+otherwise, the corpus must have been loaded with Corpus.from_compiled, and each worker memory-maps the same file.
+"""
+
+# Standard library imports
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from typing import List
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+import crosscosmos as xc
+from crosscosmos.grid import CellStatus, GridStatus
+from crosscosmos.solver import SlotSolver
+
+logger = logging.getLogger(__name__)
+
+# Corpus inherited by forked workers (set by ParallelSlotSolver.solve)
+_shared_corpus = None
+
+# Seconds to wait for workers to exit after being cancelled, before terminating them
+JOIN_TIMEOUT = 2.0
+
+
+def _fill_worker(worker_id: int,
+                 grid: xc.grid.Grid,
+                 corpus_path,
+                 seed_sequence: np.random.SeedSequence,
+                 deadline: float,
+                 results: multiprocessing.Queue,
+                 stop_event):
+    """ Fill the grid repeatedly (with a fresh seed each time) until stopped or out of time
+
+    Every complete fill is put on the results queue as (worker_id, letters). If the search space is exhausted,
+    (worker_id, None) is put instead, since no other seed can do any better.
+    """
+    corpus = _shared_corpus if corpus_path is None else xc.corpus.Corpus.from_compiled(corpus_path)
+    grid.corpus = corpus
+
+    attempt = 0
+    while not stop_event.is_set() and time.time() < deadline:
+        attempt_grid = grid.copy()
+        solver = SlotSolver(attempt_grid,
+                            corpus,
+                            max_time=deadline - time.time(),
+                            shuffle=worker_id > 0 or attempt > 0,  # Worker 0 starts with the best-scoring fill
+                            seed=seed_sequence.spawn(1)[0],
+                            stop_event=stop_event)
+        status = solver.solve()
+        logger.debug(f"Worker {worker_id} attempt {attempt}: {status.name} "
+                     f"({solver.n_nodes} nodes, {solver.n_backtracks} backtracks)")
+
+        match status:
+            case GridStatus.COMPLETE:
+                results.put((worker_id, attempt_grid.letters.copy()))
+            case GridStatus.INVALID:
+                results.put((worker_id, None))
+                return
+            case _:
+                return
+        attempt += 1
+
+
+class ParallelSlotSolver(object):
+
+    def __init__(self,
+                 grid: xc.grid.Grid,
+                 corpus: xc.corpus.Corpus = None,
+                 max_time: float = 30,
+                 n_workers: int = None,
+                 n_fills: int = 1,
+                 seed: int = None):
+        """ Fill a grid with several differently-seeded SlotSolver processes
+
+        Args:
+            grid: grid to fill
+            corpus: corpus to fill from (defaults to grid.corpus)
+            max_time: time budget in seconds
+            n_workers: number of worker processes (defaults to the number of CPUs)
+            n_fills: number of distinct fills to collect before cancelling the workers
+            seed: random seed from which every worker's seeds are derived
+        """
+        self.grid = grid
+        self.corpus = corpus or grid.corpus
+        self.max_time = max_time
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.n_fills = n_fills
+        self.seed_sequence = np.random.SeedSequence(seed)
+
+        if "fork" in multiprocessing.get_all_start_methods():
+            self.context = multiprocessing.get_context("fork")
+        else:
+            if self.corpus.compiled_path is None:
+                raise ValueError("Parallel filling without fork requires a corpus loaded with Corpus.from_compiled")
+            self.context = multiprocessing.get_context("spawn")
+
+        # Distinct fills (as grids), in the order they were found
+        self.fills: List[xc.grid.Grid] = []
+
+    def __repr__(self):
+        return f"ParallelSlotSolver(n_workers={self.n_workers}, n_fills={self.n_fills})"
+
+    def solve(self) -> GridStatus:
+        """ Run the workers, writing the first fill into the grid
+
+        Returns:
+            GridStatus.COMPLETE if at least one fill was found, GridStatus.INVALID if none exists, and
+            GridStatus.INCOMPLETE if the time budget ran out first
+        """
+        global _shared_corpus
+
+        # Build the index once, before forking, so that the workers share it
+        if self.corpus.index is None:
+            self.corpus.build_index()
+        _shared_corpus = self.corpus
+        corpus_path = None if self.context.get_start_method() == "fork" else self.corpus.compiled_path
+
+        # Workers get the grid state only
+        worker_grid = self.grid.copy()
+        worker_grid.corpus = None
+        worker_grid.tries = []
+
+        deadline = time.time() + self.max_time
+        results = self.context.Queue()
+        stop_event = self.context.Event()
+        workers = [self.context.Process(target=_fill_worker,
+                                        args=(k, worker_grid, corpus_path, seq, deadline, results, stop_event),
+                                        daemon=True)
+                   for k, seq in enumerate(self.seed_sequence.spawn(self.n_workers))]
+        for w in workers:
+            w.start()
+
+        seen = set()
+        exhausted = False
+        try:
+            while len(self.fills) < self.n_fills and not exhausted and time.time() < deadline:
+                try:
+                    worker_id, letters = results.get(timeout=0.05)
+                except queue.Empty:
+                    if not any(w.is_alive() for w in workers) and results.empty():
+                        break
+                    continue
+
+                if letters is None:
+                    exhausted = True
+                elif letters.tobytes() not in seen:
+                    seen.add(letters.tobytes())
+                    self.fills.append(self.fill_grid(letters))
+                    logger.info(f"Fill {len(self.fills)}/{self.n_fills} found by worker {worker_id}")
+        finally:
+            self.cancel(workers, results, stop_event)
+            _shared_corpus = None
+
+        if self.fills:
+            self.write_fill(self.grid, self.fills[0].letters)
+            return GridStatus.COMPLETE
+        if exhausted:
+            return GridStatus.INVALID
+        return GridStatus.INCOMPLETE
+
+    @staticmethod
+    def cancel(workers: List[multiprocessing.Process], results: multiprocessing.Queue, stop_event):
+        """ Stop the workers, draining the results queue so that none of them blocks on exit
+        """
+        stop_event.set()
+        join_deadline = time.time() + JOIN_TIMEOUT
+        while any(w.is_alive() for w in workers) and time.time() < join_deadline:
+            try:
+                results.get(timeout=0.01)
+            except queue.Empty:
+                pass
+
+        for w in workers:
+            if w.is_alive():
+                logger.warning(f"Terminating unresponsive fill worker {w.pid}")
+                w.terminate()
+            w.join()
+        results.close()
+
+    def fill_grid(self, letters: np.ndarray) -> xc.grid.Grid:
+        fill = self.grid.copy()
+        self.write_fill(fill, letters)
+        return fill
+
+    @staticmethod
+    def write_fill(grid: xc.grid.Grid, letters: np.ndarray):
+        """ Copy the letters of a fill into every open (not locked/black) cell of a grid
+        """
+        for i, j in np.argwhere(letters).tolist():
+            if grid[i, j].status not in (CellStatus.LOCKED, CellStatus.BLACK):
+                grid[i, j].update(chr(letters[i, j]))
@@ -0,0 +1,601 @@
+""" Slot-based constraint-propagation solver
+
+Every entry in the grid (a "slot", from the grid's slot table) is a variable whose domain is the list of
+corpus words that fit it. Domains are kept arc consistent across crossing cells, and the search always branches on the
+most constrained slot (smallest domain) first.
+
+Every domain reduction is explained by the set of assigned slots it follows from (kept as a bitmask of slot ids, and
+propagated along with the reduction), so that a dead end yields the set of earlier decisions that caused it. The search
+then jumps straight back to the latest of those (conflict-directed backjumping), and remembers the combination of
+words as a nogood, which is never tried again during the run.
+
+Fill times over shuffled value orderings are heavy-tailed, so by default the search restarts (with a fresh ordering,
+from the same random generator) each time it exceeds a backtrack cutoff that follows the Luby sequence (or grows
+geometrically); learned nogoods are kept across restarts. The cutoffs keep growing, so the search stays complete.
+
+ScoredSlotSolver searches the same space by branch and bound, for the fill with the highest average word score.
+"""
+
+# Standard library imports
+from collections import deque
+from enum import Enum
+import logging
+import time
+from typing import Dict, Iterator, List, Tuple, Union
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+import crosscosmos as xc
+from crosscosmos import letter_utils
+from crosscosmos.grid import CellStatus, GridSlot, GridStatus, WordDirection
+from crosscosmos.stats import SolveStats
+
+logger = logging.getLogger(__name__)
+
+# Nogoods of more decisions than this are not kept (they rarely recur)
+MAX_NOGOOD_SIZE = 8
+MAX_NOGOODS = 100_000
+
+# Backtracks allowed in the first restart attempt, and the growth factor of geometric cutoffs
+RESTART_BASE = 1000
+RESTART_FACTOR = 1.5
+
+
+class SolveTimeout(Exception):
+    pass
+
+
+class SolveRestart(Exception):
+    pass
+
+
+class RestartPolicy(Enum):
+    NONE = 1  # A single attempt
+    LUBY = 2  # Cutoffs of RESTART_BASE * (1, 1, 2, 1, 1, 2, 4, 1, ...) backtracks
+    GEOMETRIC = 3  # Cutoffs of RESTART_BASE * RESTART_FACTOR ** attempt backtracks
+
+
+def luby(i: int) -> int:
+    """ i-th term (from 1) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, ...
+    """
+    k = i.bit_length()
+    while i != (1 << k) - 1:
+        i -= (1 << (k - 1)) - 1
+        k = i.bit_length()
+    return 1 << (k - 1)
+
+
+class Slot(GridSlot):
+    """ A single entry (across or down) in the grid, linked to the entries crossing it
+    """
+    __slots__ = ("crossings",)
+
+    def __init__(self, slot_id: int, direction: WordDirection, i: int, j: int, length: int):
+        super().__init__(slot_id, direction, i, j, length)
+
+        # List of (offset in this slot, crossing slot id, offset in the crossing slot)
+        self.crossings: List[Tuple[int, int, int]] = []
+
+    def __repr__(self):
+        return f"Slot(id={self.id}, start={self.start}, len={self.length}, dir={self.direction})"
+
+
+def build_slots(grid: xc.grid.Grid) -> List[Slot]:
+    """ Create a slot for every entry in the grid (from its slot table) and link slots that share a cell
+
+    Runs of a single white cell are not entries, and are skipped.
+    """
+    slots = []
+    slot_ids: Dict[int, int] = {}  # Grid slot id -> slot id
+    for grid_slot in grid.slots:
+        if grid_slot.length > 1:
+            slot_ids[grid_slot.id] = len(slots)
+            slots.append(Slot(len(slots), grid_slot.direction, *grid_slot.start, grid_slot.length))
+
+    cell_slots = grid.cell_slots
+    cell_offsets = grid.cell_offsets
+    for s in slots:
+        if s.direction != WordDirection.HORIZONTAL:
+            continue
+        for k, (i, j) in enumerate(s.cells):
+            other = slot_ids.get(int(cell_slots[i, j, 1]))
+            if other is not None:
+                pk = int(cell_offsets[i, j, 1])
+                s.crossings.append((k, other, pk))
+                slots[other].crossings.append((pk, s.id, k))
+
+    return slots
+
+
+def bits(mask: int) -> Iterator[int]:
+    """ Indices of the set bits of a bitmask
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class SlotSolver(object):
+
+    def __init__(self,
+                 grid: xc.grid.Grid,
+                 corpus: xc.corpus.Corpus = None,
+                 max_time: float = 30,
+                 shuffle: bool = True,
+                 seed: int = None,
+                 min_score: int = None,
+                 stop_event=None,
+                 stats: SolveStats = None,
+                 restarts: RestartPolicy = RestartPolicy.LUBY,
+                 restart_base: int = RESTART_BASE):
+        """ Solve a grid one entry at a time
+
+        Only LOCKED cells are treated as fixed; any other letters in the grid are overwritten.
+
+        Args:
+            grid: grid to fill
+            corpus: corpus to fill from (defaults to grid.corpus)
+            max_time: time budget in seconds
+            shuffle: randomize the order in which candidate words are tried (otherwise by score)
+            seed: random seed used when shuffling
+            min_score: only fill with words scoring at least this much (locked entries are exempt)
+            stop_event: threading/multiprocessing Event; once set, the search gives up as if out of time
+            stats: statistics to record the run in (nothing is recorded if None)
+            restarts: restart strategy (only used when shuffling, since otherwise every attempt tries the same order)
+            restart_base: backtracks allowed in the first attempt
+        """
+        self.grid = grid
+        self.corpus = corpus or grid.corpus
+        if self.corpus.index is None:
+            self.corpus.build_index()
+        self.index = self.corpus.index
+
+        self.max_time = max_time
+        self.shuffle = shuffle
+        self.rng = np.random.default_rng(seed)
+        self.min_score = min_score
+        self.stop_event = stop_event
+        self.stats = stats
+        self.restarts = restarts if shuffle else RestartPolicy.NONE
+        self.restart_base = restart_base
+
+        self.slots = build_slots(grid)
+
+        # Slots whose every cell is locked are already decided, and are not searched over
+        self.fixed = {s.id for s in self.slots
+                      if all(grid[i, j].status == CellStatus.LOCKED for i, j in s.cells)}
+        self.free = [s for s in self.slots if s.id not in self.fixed]
+        self.free_by_length: Dict[int, List[Slot]] = {}
+        for s in self.free:
+            self.free_by_length.setdefault(s.length, []).append(s)
+
+        self.start_time = None
+        self.n_nodes = 0
+        self.n_backtracks = 0
+        self.n_restarts = 0
+        self.cutoff = None  # Backtrack count at which the current attempt restarts (None for no limit)
+        self.solution = None
+
+        # Current word of each assigned slot
+        self.assignment: Dict[int, int] = {}
+        # Slot whose domain was last emptied (by assign or propagate)
+        self.wipeout = None
+        # Learned nogoods: combinations of (slot id, word) decisions that cannot all hold in a fill, indexed by each
+        # of their decisions, as (bitmask of their slots, decisions)
+        self.nogoods: Dict[Tuple[int, int], List[Tuple[int, Tuple[Tuple[int, int], ...]]]] = {}
+        self.n_nogoods = 0
+
+    def __repr__(self):
+        return f"SlotSolver(n_slots={len(self.free)}, n_fixed={len(self.fixed)})"
+
+    def solve(self) -> GridStatus:
+        """ Run the search, writing the fill into the grid if one is found
+
+        Returns:
+            GridStatus.COMPLETE if a fill was found, GridStatus.INVALID if none exists, and
+            GridStatus.INCOMPLETE if the time budget ran out (or the search was stopped) first
+        """
+        self.start_time = time.time()
+        if self.stats:
+            with self.stats.timer("initial_domains"):
+                domains = self.initial_domains()
+        else:
+            domains = self.initial_domains()
+
+        try:
+            if domains is None or not self.propagate(domains, [s.id for s in self.free]):
+                return GridStatus.INVALID
+            while True:
+                self.cutoff = self.restart_cutoff(self.n_restarts)
+                self.assignment = {}
+                try:
+                    if self.search(domains, set(), [0] * len(self.slots)) is not None:
+                        return GridStatus.INVALID
+                    break
+                except SolveRestart:
+                    self.n_restarts += 1
+                    if self.stats:
+                        self.stats.count("restarts")
+        except SolveTimeout:
+            return GridStatus.INCOMPLETE
+
+        self.write_solution()
+        return GridStatus.COMPLETE
+
+    def restart_cutoff(self, attempt: int) -> Union[None, int]:
+        """ Backtrack count at which the given attempt (from 0) gives up, or None if it runs to the end
+        """
+        match self.restarts:
+            case RestartPolicy.LUBY:
+                return self.n_backtracks + self.restart_base * luby(attempt + 1)
+            case RestartPolicy.GEOMETRIC:
+                return self.n_backtracks + int(self.restart_base * RESTART_FACTOR ** attempt)
+            case _:
+                return None
+
+    def initial_domains(self) -> List[np.ndarray]:
+        """ Candidate words for each free slot (as indices into the corpus index), given the locked cells
+        """
+        # Locked entries may not be repeated elsewhere
+        fixed_words = {self.slot_str(s) for s in self.slots if s.id in self.fixed}
+        unused = {}
+
+        domains = [None] * len(self.slots)
+        for s in self.free:
+            bucket = self.index[s.length]
+            if s.length not in unused:
+                unused[s.length] = np.array([w not in fixed_words for w in bucket.words], dtype=bool)
+
+            mask = unused[s.length].copy()
+            if self.min_score is not None:
+                mask &= bucket.scores >= self.min_score
+            for k, (i, j) in enumerate(s.cells):
+                if self.grid[i, j].status == CellStatus.LOCKED:
+                    mask &= bucket.letters[:, k] == letter_utils.char2int(self.grid[i, j].value)
+
+            domains[s.id] = np.flatnonzero(mask).astype(np.int32)
+            if len(domains[s.id]) == 0:
+                return None
+
+        return domains
+
+    def revise(self, domains: List[np.ndarray], a: int, pa: int, b: int, pb: int):
+        """ Remove words from slot a that have no support in slot b at their shared cell
+
+        Returns:
+            The revised domain of slot a, or None if it is unchanged
+        """
+        letters_a = self.index[self.slots[a].length].letters
+        letters_b = self.index[self.slots[b].length].letters
+
+        supported = np.zeros(26, dtype=bool)
+        supported[letters_b[domains[b], pb]] = True
+
+        keep = supported[letters_a[domains[a], pa]]
+        if keep.all():
+            return None
+        return domains[a][keep]
+
+    def propagate(self, domains: List[np.ndarray], changed: List[int], explain: List[int] = None) -> bool:
+        """ Enforce arc consistency (AC-3) after the domains of the given slots have changed
+
+        Args:
+            domains: domain of each slot (modified in place)
+            changed: slots whose domains have changed
+            explain: explanation of each slot's domain (bitmask of the assigned slots it follows from), updated along
+                with the domains (not tracked if None)
+
+        Returns:
+            False if any domain was emptied (the slot is left in self.wipeout)
+        """
+        if self.stats:
+            with self.stats.timer("propagate"):
+                return self.propagate_arcs(domains, changed, explain)
+        return self.propagate_arcs(domains, changed, explain)
+
+    def propagate_arcs(self, domains: List[np.ndarray], changed: List[int], explain: List[int] = None) -> bool:
+        queue = deque(changed)
+        pending = set(changed)
+        while queue:
+            b = queue.popleft()
+            pending.discard(b)
+            for pb, a, pa in self.slots[b].crossings:
+                if a in self.fixed:
+                    continue
+
+                revised = self.revise(domains, a, pa, b, pb)
+                if self.stats:
+                    self.stats.count("revisions")
+                if revised is None:
+                    continue
+                if explain is not None:
+                    explain[a] |= explain[b]
+                if len(revised) == 0:
+                    if self.stats:
+                        self.stats.count("wipeouts")
+                    self.wipeout = a
+                    return False
+
+                domains[a] = revised
+                if a not in pending:
+                    queue.append(a)
+                    pending.add(a)
+        return True
+
+    def select_slot(self, domains: List[np.ndarray], assigned: set) -> Slot:
+        """ Most constrained (smallest domain) unassigned slot, breaking ties by the number of crossings
+        """
+        unassigned = [s for s in self.free if s.id not in assigned]
+        if not unassigned:
+            return None
+        return min(unassigned, key=lambda s: (len(domains[s.id]), -len(s.crossings)))
+
+    def assign(self,
+               domains: List[np.ndarray],
+               slot: Slot,
+               word: int,
+               assigned: set,
+               explain: List[int] = None) -> Tuple[bool, List[int]]:
+        """ Restrict a slot to a single word, removing that word from every other slot of the same length
+
+        If explain is given, the slot's domain is now explained by its own decision, and so are the removals.
+        """
+        domains[slot.id] = np.array([word], dtype=np.int32)
+        if explain is not None:
+            explain[slot.id] = 1 << slot.id
+        changed = [slot.id]
+        for other in self.free_by_length[slot.length]:
+            if other.id == slot.id or other.id in assigned:
+                continue
+            d = domains[other.id]
+            keep = d != word
+            if not keep.all():
+                if explain is not None:
+                    explain[other.id] |= 1 << slot.id
+                if not keep.any():
+                    self.wipeout = other.id
+                    return False, changed
+                domains[other.id] = d[keep]
+                changed.append(other.id)
+        return True, changed
+
+    def check_time(self):
+        if time.time() - self.start_time > self.max_time:
+            raise SolveTimeout()
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SolveTimeout()
+
+    def record_node(self, slot: Slot, n_candidates: int, depth: int):
+        """ Record a decision point in the statistics
+        """
+        self.stats.count("nodes")
+        self.stats.depth(depth)
+        self.stats.domain_size(n_candidates)
+        self.stats.event("node", depth=depth, slot=slot.id, candidates=n_candidates)
+
+    def try_assign(self,
+                   domains: List[np.ndarray],
+                   explain: List[int],
+                   slot: Slot,
+                   word: int,
+                   assigned: set) -> Union[None, int]:
+        """ Assign a word to a slot (on top of self.assignment), and propagate
+
+        Returns:
+            None if the domains are still consistent, otherwise the conflict set (bitmask of the assigned slots whose
+            words, together with this one, make the grid unfillable)
+        """
+        for mask, nogood in self.nogoods.get((slot.id, word), ()):
+            if all(self.assignment.get(s) == w for s, w in nogood):
+                if self.stats:
+                    self.stats.count("nogood_hits")
+                return mask
+
+        ok, changed = self.assign(domains, slot, word, assigned, explain)
+        if ok and self.propagate(domains, changed, explain):
+            return None
+        return explain[self.wipeout]
+
+    def learn(self, conflict: int):
+        """ Remember the current words of the slots in a conflict set as a nogood
+        """
+        nogood = tuple((s, self.assignment[s]) for s in bits(conflict))
+        if not 0 < len(nogood) <= MAX_NOGOOD_SIZE or self.n_nogoods >= MAX_NOGOODS:
+            return
+        watched = self.nogoods.setdefault(nogood[-1], [])
+        if any(other == nogood for _, other in watched):
+            return
+        for decision in nogood:
+            self.nogoods.setdefault(decision, []).append((conflict, nogood))
+        self.n_nogoods += 1
+        if self.stats:
+            self.stats.count("nogoods")
+
+    def search(self, domains: List[np.ndarray], assigned: set, explain: List[int]) -> Union[None, int]:
+        """ Depth-first search with conflict-directed backjumping
+
+        Args:
+            domains: domain of each slot
+            assigned: slots assigned so far
+            explain: explanation of each slot's domain (bitmask of the assigned slots it follows from)
+
+        Returns:
+            None once a fill is found, otherwise the conflict set of this subtree (bitmask of the assigned slots whose
+            words make it unfillable)
+        """
+        self.check_time()
+        self.n_nodes += 1
+
+        slot = self.select_slot(domains, assigned)
+        if slot is None:
+            self.solution = domains
+            return None
+
+        candidates = domains[slot.id]
+        if self.stats:
+            self.record_node(slot, len(candidates), len(assigned))
+        if self.shuffle:
+            candidates = self.rng.permutation(candidates)
+
+        slot_bit = 1 << slot.id
+        conflict = explain[slot.id]  # Whatever ruled out the words no longer in the domain
+        for word in candidates.tolist():
+            new_domains = list(domains)
+            new_explain = list(explain)
+            self.assignment[slot.id] = word
+            word_conflict = self.try_assign(new_domains, new_explain, slot, word, assigned)
+            if word_conflict is None:
+                word_conflict = self.search(new_domains, assigned | {slot.id}, new_explain)
+                if word_conflict is None:
+                    return None
+            del self.assignment[slot.id]
+
+            self.n_backtracks += 1
+            if self.stats:
+                self.stats.backtrack(slot.start)
+            if self.cutoff is not None and self.n_backtracks >= self.cutoff:
+                raise SolveRestart()
+
+            # The failure does not depend on this slot's word, so no other word can help: jump back past it
+            if not word_conflict & slot_bit:
+                if self.stats:
+                    self.stats.count("backjumps")
+                return word_conflict
+            conflict |= word_conflict
+
+        conflict &= ~slot_bit
+        self.learn(conflict)
+        return conflict
+
+    def slot_str(self, slot: Slot) -> str:
+        return "".join([self.grid[i, j].value or "-" for i, j in slot.cells])
+
+    def slot_word(self, slot: Slot) -> str:
+        """ Word assigned to a slot in the solution
+        """
+        if slot.id in self.fixed:
+            return self.slot_str(slot)
+        return self.index[slot.length].words[self.solution[slot.id][0]]
+
+    def write_solution(self):
+        for s in self.free:
+            word = self.slot_word(s)
+            for (i, j), letter in zip(s.cells, word):
+                if self.grid[i, j].status != CellStatus.LOCKED:
+                    self.grid[i, j].update(letter)
+
+
+class ScoredSlotSolver(SlotSolver):
+
+    def __init__(self,
+                 grid: xc.grid.Grid,
+                 corpus: xc.corpus.Corpus = None,
+                 max_time: float = 30,
+                 min_score: int = None,
+                 stop_event=None,
+                 stats: SolveStats = None):
+        """ Search for the fill with the highest average word score (over the free entries)
+
+        Candidates are tried best-first, and every fill found raises the bar: any branch whose best possible average
+        (the top-scoring word left in each slot's domain) cannot beat it is pruned. The best fill found when the search
+        space is exhausted, or the time budget runs out, is written into the grid.
+
+        Args:
+            grid: grid to fill
+            corpus: corpus to fill from (defaults to grid.corpus)
+            max_time: time budget in seconds
+            min_score: only fill with words scoring at least this much (locked entries are exempt)
+            stop_event: threading/multiprocessing Event; once set, the search stops as if out of time
+            stats: statistics to record the run in (nothing is recorded if None)
+        """
+        super().__init__(grid, corpus, max_time=max_time, shuffle=False, min_score=min_score, stop_event=stop_event,
+                         stats=stats)
+
+        self.best_total = None
+        self.best_score = None  # Average over the free entries
+        self.n_fills = 0
+        self.optimal = False
+
+    def __repr__(self):
+        return f"ScoredSlotSolver(n_slots={len(self.free)}, n_fixed={len(self.fixed)})"
+
+    def solve(self) -> GridStatus:
+        """ Run the search, writing the best fill into the grid if one is found
+
+        Returns:
+            GridStatus.COMPLETE if a fill was found (self.optimal tells whether it is provably the best),
+            GridStatus.INVALID if none exists, and GridStatus.INCOMPLETE if the time budget ran out before any fill
+            was found
+        """
+        self.start_time = time.time()
+        if self.stats:
+            with self.stats.timer("initial_domains"):
+                domains = self.initial_domains()
+        else:
+            domains = self.initial_domains()
+        if domains is None or not self.propagate(domains, [s.id for s in self.free]):
+            return GridStatus.INVALID
+        if not self.free:
+            return GridStatus.COMPLETE
+
+        try:
+            self.search(domains, set())
+            self.optimal = True
+        except SolveTimeout:
+            pass
+
+        if self.solution is None:
+            return GridStatus.INVALID if self.optimal else GridStatus.INCOMPLETE
+
+        self.write_solution()
+        return GridStatus.COMPLETE
+
+    def bound(self, domains: List[np.ndarray]) -> int:
+        """ Best total score reachable from the given domains
+
+        Domains are kept in index order, i.e. by descending score, so each slot's best word is its first.
+        """
+        return sum(int(self.index[s.length].scores[domains[s.id][0]]) for s in self.free)
+
+    def search(self, domains: List[np.ndarray], assigned: set) -> bool:
+        self.check_time()
+        self.n_nodes += 1
+
+        bound = self.bound(domains)
+        if self.best_total is not None and bound <= self.best_total:
+            return False
+
+        slot = self.select_slot(domains, assigned)
+        if slot is None:
+            self.solution = domains
+            self.best_total = bound
+            self.best_score = bound / len(self.free)
+            self.n_fills += 1
+            if self.stats:
+                self.stats.count("fills")
+                self.stats.event("fill", score=self.best_score)
+            logger.debug(f"Fill {self.n_fills} found with average score {self.best_score:.2f}")
+            return False
+
+        if self.stats:
+            self.record_node(slot, len(domains[slot.id]), len(assigned))
+
+        scores = self.index[slot.length].scores
+        others = bound - int(scores[domains[slot.id][0]])
+        for word in domains[slot.id]:
+            # Candidates are in descending score order, so once one cannot beat the best fill, neither can the rest
+            if self.best_total is not None and others + int(scores[word]) <= self.best_total:
+                break
+
+            new_domains = list(domains)
+            ok, changed = self.assign(new_domains, slot, word, assigned)
+            if ok and self.propagate(new_domains, changed):
+                self.search(new_domains, assigned | {slot.id})
+            self.n_backtracks += 1
+            if self.stats:
+                self.stats.backtrack(slot.start)
+
+        return False
@@ -0,0 +1,109 @@
+""" Solver instrumentation: counters, timers and a sampled trace
+
+Solvers take an optional SolveStats, and only touch it behind an `if stats:` guard, so that an uninstrumented solve
+pays nothing beyond that check. After the run, SolveStats.summary() gives a JSON-serializable dict, and SolveStats.save()
+writes it out. If a trace path is given, every n-th traced event is also appended to it as a line of JSON.
+"""
+
+# Standard library imports
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+import json
+import logging
+from pathlib import Path
+import time
+from typing import Dict, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+class SolveStats(object):
+
+    def __init__(self, trace_path: Union[None, Path] = None, sample_every: int = 100):
+        """ Statistics for a single solver run
+
+        Args:
+            trace_path: file to write the sampled trace to (as JSON lines); no trace is kept if None
+            sample_every: keep one in every sample_every traced events
+        """
+        self.counters = Counter()
+        self.timers: Dict[str, float] = defaultdict(float)
+        self.backtracks: Dict[Tuple[int, int], int] = Counter()  # Backtracks per cell
+        self.domain_sizes = Counter()  # Histogram of the number of candidates at each decision
+        self.max_depth = 0
+
+        self.sample_every = sample_every
+        self.trace_path = trace_path
+        self._trace_file = open(trace_path, "w") if trace_path else None
+        self._n_events = 0
+        self._start = time.perf_counter()
+
+    def __repr__(self):
+        return f"SolveStats({dict(self.counters)})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] += n
+
+    def backtrack(self, cell: Tuple[int, int]):
+        self.counters["backtracks"] += 1
+        self.backtracks[cell] += 1
+
+    def domain_size(self, n: int):
+        self.domain_sizes[n] += 1
+
+    def depth(self, depth: int):
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    @contextmanager
+    def timer(self, phase: str):
+        """ Accumulate the time spent in a phase
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[phase] += time.perf_counter() - start
+
+    def event(self, name: str, **fields):
+        """ Record an event in the trace (if sampled)
+        """
+        if self._trace_file is None:
+            return
+        self._n_events += 1
+        if self._n_events % self.sample_every:
+            return
+        record = dict(event=name, t=round(time.perf_counter() - self._start, 6), n=self._n_events, **fields)
+        self._trace_file.write(json.dumps(record) + "\n")
+
+    def close(self):
+        if self._trace_file is not None:
+            self._trace_file.close()
+            self._trace_file = None
+
+    def summary(self) -> dict:
+        n_decisions = sum(self.domain_sizes.values())
+        return dict(
+            elapsed=time.perf_counter() - self._start,
+            counters=dict(self.counters),
+            timers=dict(self.timers),
+            max_depth=self.max_depth,
+            domain_sizes=dict(
+                n=n_decisions,
+                mean=sum(k * n for k, n in self.domain_sizes.items()) / n_decisions if n_decisions else None,
+                max=max(self.domain_sizes) if n_decisions else None,
+            ),
+            top_backtracks=[dict(cell=list(cell), n=n) for cell, n in self.backtracks.most_common(10)],
+        )
+
+    def save(self, path: Path):
+        """ Write the summary to a JSON file
+        """
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
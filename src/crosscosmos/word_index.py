@@ -0,0 +1,328 @@
+""" Array-backed index of the words in a corpus, grouped by word length
+
+For every length, the index keeps a packed bitset per (position, letter) pair, so that a pattern such as "A--D" is
+answered by AND-ing a couple of bitsets rather than scanning the whole word list.
+
+An index can be compiled to a single binary file (WordIndex.save) and memory-mapped back in (WordIndex.load), so that
+any number of processes share one page-cached copy. The file layout is:
+
+    MAGIC (8 bytes) | header size (uint64) | JSON header | arrays (each aligned to ARRAY_ALIGNMENT bytes)
+
+where the header records the dtype, shape and offset of each array, plus any metadata.
+"""
+
+# Standard library imports
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+from crosscosmos import letter_utils
+
+logger = logging.getLogger(__name__)
+
+# Number of set bits in each possible byte
+POPCOUNT = np.array([bin(b).count("1") for b in range(256)], dtype=np.int32)
+
+# Compiled index file format
+MAGIC = b"XCWIDX01"
+ARRAY_ALIGNMENT = 64
+
+
+class LengthBucket(object):
+    """ All words of a single length, stored as a (n_words x length) matrix of letter codes
+
+    Words are sorted by descending score, so that any filtered subset of bucket indices is
+    still in score order.
+    """
+
+    def __init__(self,
+                 length: int,
+                 letters: np.ndarray,
+                 scores: np.ndarray,
+                 entries: np.ndarray,
+                 masks: np.ndarray = None):
+        """
+        Args:
+            length: word length
+            letters: (n_words x length) uint8 matrix of letter codes (A=0, ..., Z=25), in score order
+            scores: score of each word
+            entries: index of each word in the corpus word list
+            masks: precomputed packed bitsets (see LengthBucket.masks); built on first use if not given
+        """
+        self.length = length
+        self.letters = letters
+        self.scores = scores
+        self.entries = entries
+
+        self._words = None
+        self._masks = masks
+        self.full_mask = np.packbits(np.ones(len(self.letters), dtype=bool))
+
+    def __len__(self):
+        return len(self.letters)
+
+    def __repr__(self):
+        return f"LengthBucket(length={self.length}, n={len(self)})"
+
+    @classmethod
+    def from_words(cls, length: int, words: List[str], scores: List[int], entries: List[int]):
+        order = np.argsort(-np.asarray(scores, dtype=np.int32), kind="stable")
+        sorted_words = [words[k] for k in order]
+
+        if sorted_words:
+            letters = np.frombuffer("".join(sorted_words).encode("ascii"), dtype=np.uint8).reshape(-1, length) - 65
+        else:
+            letters = np.empty((0, length), dtype=np.uint8)
+
+        bucket = cls(length,
+                     letters,
+                     np.asarray(scores, dtype=np.int32)[order],
+                     np.asarray(entries, dtype=np.int32)[order])
+        bucket._words = sorted_words
+        return bucket
+
+    @property
+    def words(self) -> List[str]:
+        """ The words as strings (decoded from the letter matrix on first use)
+        """
+        if self._words is None:
+            text = (self.letters + 65).tobytes().decode("ascii")
+            self._words = [text[k:k + self.length] for k in range(0, len(text), self.length)]
+        return self._words
+
+    @property
+    def masks(self) -> np.ndarray:
+        """ Packed bitsets of shape (length, 26, n_bytes): bit k of masks[i, c] is set if word k has letter c at i
+        """
+        if self._masks is None:
+            letters = np.arange(26, dtype=np.uint8)[None, :, None]
+            self._masks = np.packbits(self.letters.T[:, None, :] == letters, axis=-1)
+        return self._masks
+
+    def match_mask(self, letters_with_idxs: List[Tuple[int, str]]) -> np.ndarray:
+        """ Packed bitset of the words with the given letters at the given positions
+        """
+        mask = self.full_mask
+        for i, c in letters_with_idxs:
+            mask = mask & self.masks[i, letter_utils.char2int(c)]
+        return mask
+
+    def pattern_mask(self, codes: np.ndarray) -> np.ndarray:
+        """ Packed bitset of the words matching a row of character codes, such as Grid.letters (0 for any letter)
+        """
+        mask = self.full_mask
+        for i in np.flatnonzero(codes):
+            mask = mask & self.masks[i, codes[i] - 65]
+        return mask
+
+    def mask_to_indices(self, mask: np.ndarray) -> np.ndarray:
+        """ Bucket indices (in score order) of the words in a packed bitset
+        """
+        return np.flatnonzero(np.unpackbits(mask, count=len(self)))
+
+    @staticmethod
+    def mask_count(mask: np.ndarray) -> int:
+        return int(POPCOUNT[mask].sum())
+
+    def match(self, letters_with_idxs: List[Tuple[int, str]]) -> np.ndarray:
+        return self.mask_to_indices(self.match_mask(letters_with_idxs))
+
+    def count(self, letters_with_idxs: List[Tuple[int, str]]) -> int:
+        return self.mask_count(self.match_mask(letters_with_idxs))
+
+
+class WordIndex(object):
+    """ Index of a corpus by word length
+
+    Only words made up entirely of the letters A-Z are indexed.
+    """
+
+    def __init__(self, buckets: Dict[int, LengthBucket], metadata: dict = None):
+        self.buckets = buckets
+        self.metadata = metadata or {}
+
+    def __getitem__(self, length: int) -> LengthBucket:
+        if length not in self.buckets:
+            self.buckets[length] = LengthBucket.from_words(length, [], [], [])
+        return self.buckets[length]
+
+    def __len__(self):
+        return sum(len(b) for b in self.buckets.values())
+
+    def __repr__(self):
+        return f"WordIndex(lengths={sorted(self.buckets.keys())})"
+
+    def match(self, length: int, letters_with_idxs: List[Tuple[int, str]]) -> np.ndarray:
+        """ Corpus indices of every word of a given length with the given letters at the given positions
+
+        Args:
+            length: word length
+            letters_with_idxs: list of (position, letter) pairs, e.g. [(0, 'A'), (3, 'D')] for "A--D"
+
+        Returns:
+            np.ndarray of indices into the corpus word list, sorted by descending score
+        """
+        bucket = self[length]
+        if any(i >= length for i, _ in letters_with_idxs):
+            return bucket.entries[:0]
+        return bucket.entries[bucket.match(letters_with_idxs)]
+
+    @classmethod
+    def from_words(cls, words: List[str], scores: List[int] = None):
+        """ Build an index from a list of words (and optionally, their scores)
+
+        Args:
+            words: list of words
+            scores: list of scores (same length as words)
+
+        Returns:
+            WordIndex
+        """
+        by_len = {}
+        for k, word in enumerate(words):
+            word = word.upper()
+            if not letter_utils.is_only_letters(word):
+                continue
+            by_len.setdefault(len(word), ([], [], []))
+            by_len[len(word)][0].append(word)
+            by_len[len(word)][1].append(scores[k] if scores else 0)
+            by_len[len(word)][2].append(k)
+
+        buckets = {n: LengthBucket.from_words(n, *lists) for n, lists in by_len.items()}
+        return cls(buckets)
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        logger.info(f"Building word index for {corpus}")
+        score_fn = corpus.score_fn
+        return cls.from_words([w.word for w in corpus.word_list],
+                              [score_fn(w) or 0 for w in corpus.word_list])
+
+    def save(self, path: Path, metadata: dict = None):
+        """ Compile the index (letters, scores and bitsets for every length) to a single binary file
+
+        Bucket entries are not saved: a loaded index numbers its words by length, then by score (see WordIndex.load).
+
+        Args:
+            path: output file
+            metadata: JSON-serializable information to store alongside the index
+        """
+        arrays = {}
+        for n in sorted(self.buckets):
+            bucket = self.buckets[n]
+            if len(bucket) == 0:
+                continue
+            arrays[f"letters_{n}"] = np.ascontiguousarray(bucket.letters, dtype=np.uint8)
+            arrays[f"scores_{n}"] = np.ascontiguousarray(bucket.scores, dtype=np.int32)
+            arrays[f"masks_{n}"] = np.ascontiguousarray(bucket.masks, dtype=np.uint8)
+
+        # Lay out the arrays after the header
+        header = {"metadata": metadata or {}, "arrays": {}}
+        offset = 0
+        for name, a in arrays.items():
+            header["arrays"][name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset}
+            offset += -(-a.nbytes // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_start = -(-(len(MAGIC) + 8 + len(header_bytes)) // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(np.uint64(len(header_bytes)).tobytes())
+            f.write(header_bytes)
+            for name, a in arrays.items():
+                f.seek(data_start + header["arrays"][name]["offset"])
+                f.write(a.tobytes())
+            f.truncate(data_start + offset)
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True):
+        """ Load a compiled index (see WordIndex.save)
+
+        Args:
+            path: compiled index file
+            mmap: memory-map the arrays (read-only) instead of reading them into memory
+
+        Returns:
+            WordIndex, whose entries number the words by length, then by score
+        """
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a compiled word index: {path}")
+            header_size = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(header_size).decode("utf-8"))
+            data_start = -(-(len(MAGIC) + 8 + header_size) // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+
+            arrays = {}
+            for name, info in header["arrays"].items():
+                dtype = np.dtype(info["dtype"])
+                shape = tuple(info["shape"])
+                if mmap:
+                    a = np.memmap(path, dtype=dtype, mode="r", offset=data_start + info["offset"], shape=shape)
+                    arrays[name] = np.asarray(a)
+                else:
+                    f.seek(data_start + info["offset"])
+                    arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+        buckets = {}
+        n_words = 0
+        lengths = sorted(int(name.split("_")[1]) for name in arrays if name.startswith("letters_"))
+        for n in lengths:
+            letters = arrays[f"letters_{n}"]
+            buckets[n] = LengthBucket(n,
+                                      letters,
+                                      arrays[f"scores_{n}"],
+                                      np.arange(n_words, n_words + len(letters), dtype=np.int32),
+                                      masks=arrays[f"masks_{n}"])
+            n_words += len(letters)
+
+        return cls(buckets, metadata=header["metadata"])
+
+
+class IndexedWord(object):
+    """ A word (and its score) read from a compiled word index
+    """
+    __slots__ = ("word", "score")
+
+    def __init__(self, word: str, score: int):
+        self.word = word
+        self.score = score
+
+    def __repr__(self):
+        return f"IndexedWord[\'{self.word}\', {self.score}]"
+
+
+class IndexWordList(object):
+    """ Read-only sequence of the words in a compiled index, numbered by length, then by score
+
+    Words are created on access, so that a compiled corpus can be loaded without materializing every word.
+    """
+
+    def __init__(self, index: WordIndex):
+        self.index = index
+        self.lengths = sorted(index.buckets)
+        self.offsets = np.cumsum([0] + [len(index.buckets[n]) for n in self.lengths])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, position: int) -> IndexedWord:
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("word index out of range")
+
+        b = int(np.searchsorted(self.offsets, position, side="right")) - 1
+        bucket = self.index.buckets[self.lengths[b]]
+        k = position - int(self.offsets[b])
+        return IndexedWord(bucket.words[k], int(bucket.scores[k]))
+
+    def __iter__(self):
+        for n in self.lengths:
+            bucket = self.index.buckets[n]
+            for word, word_score in zip(bucket.words, bucket.scores.tolist()):
+                yield IndexedWord(word, word_score)
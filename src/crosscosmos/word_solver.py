@@ -0,0 +1,256 @@
+""" Word-at-a-time grid filling
+
+Rather than looping over letters, the search picks an open entry (one with an empty cell), enumerates the corpus words
+matching the letters already in it, best-scoring first, and places each in turn with Grid.set_word, backtracking over
+whole words. Entries are chosen most constrained first (fewest candidates, then longest), so long theme entries and
+spanners are placed in a handful of steps, and any entry left without a candidate ends the branch at once.
+
+Candidates come straight from the word index bitsets; the words used so far in the fill are kept in a per-length bitset
+over the same index, which is never modified.
+"""
+
+# Standard library imports
+from collections import OrderedDict
+import logging
+import time
+from typing import Dict, List, Tuple, Union
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+import crosscosmos as xc
+from crosscosmos.grid import SLOT_AXIS, CellStatus, GridSlot, GridStatus, WordDirection
+from crosscosmos.solver import SolveTimeout
+from crosscosmos.stats import SolveStats
+
+logger = logging.getLogger(__name__)
+
+CROSSING = {WordDirection.HORIZONTAL: WordDirection.VERTICAL, WordDirection.VERTICAL: WordDirection.HORIZONTAL}
+
+# Candidate masks kept per entry (for its most recently seen letter patterns)
+MASK_CACHE_SIZE = 16
+
+
+class WordSolver(object):
+
+    def __init__(self,
+                 grid: xc.grid.Grid,
+                 corpus: xc.corpus.Corpus = None,
+                 max_time: float = 30,
+                 min_score: int = None,
+                 stop_event=None,
+                 stats: SolveStats = None):
+        """ Solve a grid one whole word at a time
+
+        Only LOCKED cells are treated as fixed; any other letters in the grid are cleared first.
+
+        Args:
+            grid: grid to fill
+            corpus: corpus to fill from (defaults to grid.corpus)
+            max_time: time budget in seconds
+            min_score: only fill with words scoring at least this much (locked entries are exempt)
+            stop_event: threading/multiprocessing Event; once set, the search gives up as if out of time
+            stats: statistics to record the run in (nothing is recorded if None)
+        """
+        self.grid = grid
+        self.corpus = corpus or grid.corpus
+        if self.corpus.index is None:
+            self.corpus.build_index()
+        self.index = self.corpus.index
+
+        self.max_time = max_time
+        self.min_score = min_score
+        self.stop_event = stop_event
+        self.stats = stats
+
+        # Runs of a single white cell are not entries (as in solver.build_slots)
+        self.slots = [s for s in grid.slots if s.length > 1]
+        self._slots_by_id = {s.id: s for s in self.slots}
+        self._cells = {s.id: tuple(np.array(s.cells).T) for s in self.slots}  # (rows, cols) of each slot
+        # Slot id -> letters -> matching words, least recently used first (see pattern_mask)
+        self._masks: Dict[int, OrderedDict] = {s.id: OrderedDict() for s in self.slots}
+
+        # Words used so far, as a packed bitset over each length bucket (same layout as its masks)
+        self.used: Dict[int, np.ndarray] = {}
+        self.allowed: Dict[int, np.ndarray] = {}  # Words scoring at least min_score (all words if None)
+
+        self.start_time = None
+        self.n_nodes = 0
+        self.n_backtracks = 0
+
+    def __repr__(self):
+        return f"WordSolver(n_slots={len(self.slots)})"
+
+    def solve(self) -> GridStatus:
+        """ Run the search, leaving the fill in the grid if one is found
+
+        Returns:
+            GridStatus.COMPLETE if a fill was found, GridStatus.INVALID if none exists, and
+            GridStatus.INCOMPLETE if the time budget ran out (or the search was stopped) first
+        """
+        self.start_time = time.time()
+        self.grid.clear()
+        for length in {s.length for s in self.slots}:
+            bucket = self.index[length]
+            self.used[length] = np.zeros_like(bucket.full_mask)
+            if self.min_score is None:
+                self.allowed[length] = bucket.full_mask
+            else:
+                self.allowed[length] = np.packbits(bucket.scores >= self.min_score)
+
+        # Locked entries may not be repeated elsewhere (they are exempt from min_score)
+        for s in self.slots:
+            letters = self.slot_letters(s)
+            if letters.all():
+                self.use_word(s, self.index[s.length].pattern_mask(letters))
+
+        try:
+            if self.search(0):
+                return GridStatus.COMPLETE
+            return GridStatus.INVALID
+        except SolveTimeout:
+            self.grid.clear()
+            return GridStatus.INCOMPLETE
+
+    def slot_letters(self, slot: GridSlot) -> np.ndarray:
+        """ Character code in each cell of an entry (0 if empty)
+        """
+        return self.grid.letters[self._cells[slot.id]]
+
+    def pattern_mask(self, slot: GridSlot, letters: np.ndarray) -> np.ndarray:
+        """ Packed bitset of the words matching an entry's letters (used or not)
+
+        The last MASK_CACHE_SIZE patterns of each entry are kept, since most entries are unchanged from one node to
+        the next; older ones are recomputed when they come back.
+        """
+        masks = self._masks[slot.id]
+        key = letters.tobytes()
+        mask = masks.get(key)
+        if mask is None:
+            mask = self.index[slot.length].pattern_mask(letters) & self.allowed[slot.length]
+            masks[key] = mask
+            if len(masks) > MASK_CACHE_SIZE:
+                masks.popitem(last=False)
+        else:
+            masks.move_to_end(key)
+        return mask
+
+    def use_word(self, slot: GridSlot, mask: np.ndarray) -> Union[int, None]:
+        """ Mark the word in a full entry as used
+
+        Args:
+            slot: full entry
+            mask: packed bitset of the words allowed in it (see LengthBucket.pattern_mask)
+
+        Returns:
+            Its index in the length bucket, or None if it is not an available word
+        """
+        bucket = self.index[slot.length]
+        mask = mask & ~self.used[slot.length]
+        indices = bucket.mask_to_indices(mask)
+        if len(indices) == 0:
+            return None
+        k = int(indices[0])
+        self.used[slot.length][k >> 3] |= 0x80 >> (k & 7)
+        return k
+
+    def release_word(self, length: int, k: int):
+        self.used[length][k >> 3] &= ~np.uint8(0x80 >> (k & 7))
+
+    def select_slot(self) -> Tuple[Union[GridSlot, None], np.ndarray]:
+        """ Open entry with the fewest candidates (the longest, among equals), and its candidates in score order
+
+        Returns:
+            (None, None) if every entry is full
+        """
+        best = None
+        for s in self.slots:
+            letters = self.slot_letters(s)
+            if letters.all():
+                continue
+            mask = self.pattern_mask(s, letters) & ~self.used[s.length]
+            n = self.index[s.length].mask_count(mask)
+            if best is None or (n, -s.length) < (best[0], -best[1].length):
+                best = (n, s, mask)
+                if n == 0:
+                    break
+        if best is None:
+            return None, None
+        _, slot, mask = best
+        return slot, self.index[slot.length].mask_to_indices(mask)
+
+    def place(self, slot: GridSlot, k: int) -> Union[Tuple[np.ndarray, np.ndarray, List[Tuple[int, int]]], None]:
+        """ Write a candidate word into an entry, and mark it (and any crossing entry it completes) as used
+
+        Returns:
+            What unplace needs to undo it, or None if a completed crossing entry is not an available word (in which
+            case nothing has changed)
+        """
+        cells = self._cells[slot.id]
+        letters = self.grid.letters[cells].copy()
+        statuses = self.grid.statuses[cells].copy()
+
+        self.grid.set_word(self.index[slot.length].words[k], *slot.start, slot.direction)
+        self.grid.statuses[cells] = np.where(letters != 0, statuses, CellStatus.SET.value)  # Keep the locks
+        self.used[slot.length][k >> 3] |= 0x80 >> (k & 7)
+        used = [(slot.length, k)]
+
+        axis = SLOT_AXIS[CROSSING[slot.direction]]
+        for offset in np.flatnonzero(letters == 0):
+            x, y = slot.cells[offset]
+            crossing = self._slots_by_id.get(int(self.grid.cell_slots[x, y, axis]))
+            if crossing is None:
+                continue
+            crossing_letters = self.slot_letters(crossing)
+            if not crossing_letters.all():
+                continue
+            crossing_mask = self.index[crossing.length].pattern_mask(crossing_letters) & self.allowed[crossing.length]
+            k_crossing = self.use_word(crossing, crossing_mask)
+            if k_crossing is None:
+                self.unplace(slot, (letters, statuses, used))
+                return None
+            used.append((crossing.length, k_crossing))
+
+        return letters, statuses, used
+
+    def unplace(self, slot: GridSlot, placed: Tuple[np.ndarray, np.ndarray, List[Tuple[int, int]]]):
+        letters, statuses, used = placed
+        cells = self._cells[slot.id]
+        self.grid.letters[cells] = letters
+        self.grid.statuses[cells] = statuses
+        for length, k in used:
+            self.release_word(length, k)
+
+    def check_time(self):
+        if time.time() - self.start_time > self.max_time:
+            raise SolveTimeout()
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SolveTimeout()
+
+    def search(self, depth: int) -> bool:
+        self.check_time()
+        self.n_nodes += 1
+
+        slot, candidates = self.select_slot()
+        if slot is None:
+            return True
+
+        if self.stats:
+            self.stats.count("nodes")
+            self.stats.depth(depth)
+            self.stats.domain_size(len(candidates))
+            self.stats.event("node", depth=depth, slot=slot.id, candidates=len(candidates))
+
+        for k in candidates.tolist():
+            placed = self.place(slot, k)
+            if placed is not None:
+                if self.search(depth + 1):
+                    return True
+                self.unplace(slot, placed)
+
+            self.n_backtracks += 1
+            if self.stats:
+                self.stats.backtrack(slot.start)
+
+        return False
@@ -12,15 +12,14 @@ import logging
 
 # Local imports
 import crosscosmos as xc
-from crosscosmos.data_models import collab_word_list_model
+from crosscosmos.data_models import WRITE_PRAGMAS, collab_word_list_model
 from crosscosmos.wordlists import parse_word_score
 
 logger = logging.getLogger(__name__)
 
+collab_word_list_model.bind(pragmas=WRITE_PRAGMAS)
 collab_word_list_path = xc.crosscosmos_project_root / 'resources' / 'collab_word_list.csv'
 
 parse_word_score.parse_word_score(collab_word_list_path,
                                   collab_word_list_model.CollabWordListWord,
                                   ";")
-
-collab_word_list_model.orm.commit()
@@ -9,24 +9,21 @@ Source (Diehl Trimmed List):
 """
 
 # Standard library imports
-import csv
 import logging
 
 # Third-party imports
 
 # Local imports
 import crosscosmos as xc
-from crosscosmos.data_models import diehl_model
+from crosscosmos.data_models import WRITE_PRAGMAS, diehl_model
 from crosscosmos.wordlists import parse_word_score
 
 logger = logging.getLogger(__name__)
 
-
-diehl_path = xc.crosscosmos_project_root / 'resources' / 'broda_trimmed_by_diehl_2020.csv'
+diehl_model.bind(pragmas=WRITE_PRAGMAS)
+diehl_path = xc.crosscosmos_project_root / 'resources' / 'word_lists' / 'broda_trimmed_by_diehl_2020.csv'
 
 
 parse_word_score.parse_word_score(diehl_path,
-                                  diehl_model.CollabWordListWord,
+                                  diehl_model.DiehlWord,
                                   ";")
-
-diehl_model.orm.commit()
@@ -9,24 +9,33 @@ Source (Diehl Trimmed List):
 """
 
 # Standard library imports
-import csv
 import logging
 import pathlib
 
 # Third-party imports
+from pony import orm
 
 # Local imports
-import crosscosmos as xc
+from crosscosmos.wordlists import parsing_utils
 
 logger = logging.getLogger(__name__)
 
 
-def parse_word_score(word_score_path: pathlib.Path, word_model, delimiter: str):
-    i = 0
-    for row in xc.wordlists.parsing_utils.read_csv_generator(word_score_path, delimiter):
-        if i % 100 == 0:
-            print(i)
-        word, score = row
-
-        word_model(word=word, score=score)
-        i += 1
+def parse_word_score(word_score_path: pathlib.Path, word_model, delimiter: str,
+                     batch_size: int = parsing_utils.BATCH_SIZE) -> int:
+    """ Load a "word;score" list into a word model, one transaction per batch of rows
+
+    Re-running updates the scores of words that are already present.
+
+    Returns:
+        Number of rows inserted or changed
+    """
+    progress = parsing_utils.IngestProgress(word_score_path.name)
+    n_changed = 0
+    for batch in parsing_utils.read_csv_batches(word_score_path, delimiter, batch_size):
+        rows = [(row[0], int(row[1]), len(row[0])) for row in batch if len(row) == 2]
+        with orm.db_session:
+            n = parsing_utils.bulk_insert(word_model, ("word", "score", "length"), rows, update=True)
+        n_changed += n
+        progress.update(len(batch), changed=n)
+    return n_changed
@@ -9,69 +9,87 @@ import logging
 import sys
 
 # Third-party imports
+from pony import orm
 
 # Local imports
 import crosscosmos as xc
-from crosscosmos.data_models import xd_model
+from crosscosmos.data_models import WRITE_PRAGMAS, xd_model
+from crosscosmos.wordlists import parsing_utils
 
 csv.field_size_limit(sys.maxsize)
 
 logger = logging.getLogger(__name__)
 
+
+def parse_xd(path, batch_size: int = parsing_utils.BATCH_SIZE) -> dict:
+    """ Load an xd clue dump (pubid, year, answer, clue TSV) into the xd database
+
+    Rows are streamed in batches, and each batch is written with one executemany per table inside a single
+    transaction. Words, years and publication ids already in the database (or earlier in the file) are tracked in
+    memory, so that only new ones are inserted; duplicate usages are skipped by their unique key. Re-running on the
+    same file therefore changes nothing.
+
+    Returns:
+        Number of rows inserted into each table
+    """
+    known_words = parsing_utils.select_keys(xd_model.XdWord, "word")
+    known_years = parsing_utils.select_keys(xd_model.XdYear, "year")
+    known_pubids = parsing_utils.select_keys(xd_model.XdPubId, "pubid")
+
+    progress = parsing_utils.IngestProgress(path.name)
+    totals = dict(words=0, years=0, pubids=0, usages=0)
+    for batch in parsing_utils.read_csv_batches(path, "\t", batch_size):
+        new_words = []
+        new_years = []
+        new_pubids = []
+        usages = []
+        for row in batch:
+            if not row or len(row) != 4:
+                continue
+
+            pubid, year, word, clue = row
+
+            if pubid == "pubid":
+                continue
+
+            # If we don't have a word, then why bother?
+            if not word:
+                continue
+
+            if word not in known_words:
+                known_words.add(word)
+                new_words.append((word,))
+
+            # Only add a usage entry if we have a clue (and the usage's required publication/year)
+            fmt_clue = clue.strip().replace(".", "")
+            if not fmt_clue or not pubid or not year:
+                continue
+            year = int(year)
+
+            if pubid not in known_pubids:
+                known_pubids.add(pubid)
+                new_pubids.append((pubid,))
+            if year not in known_years:
+                known_years.add(year)
+                new_years.append((year,))
+
+            usages.append((pubid, year, word, fmt_clue))
+
+        with orm.db_session:
+            counts = dict(
+                words=parsing_utils.bulk_insert(xd_model.XdWord, ("word",), new_words),
+                years=parsing_utils.bulk_insert(xd_model.XdYear, ("year",), new_years),
+                pubids=parsing_utils.bulk_insert(xd_model.XdPubId, ("pubid",), new_pubids),
+                usages=parsing_utils.bulk_insert(xd_model.XdWordUsage, ("pubid", "year", "word", "clue"), usages),
+            )
+        for k, n in counts.items():
+            totals[k] += n
+        progress.update(len(batch), **counts)
+
+    return totals
+
+
+xd_model.bind(pragmas=WRITE_PRAGMAS)
 xd_path = xc.crosscosmos_project_root / 'resources' / 'xd_0_to_2m.tsv'
 # xd_path = xc.crosscosmos_root / 'resources' / 'xd_4m_onward.tsv'
-i = 0
-for row in xc.wordlists.parsing_utils.read_csv_generator(xd_path, "\t"):
-    if i % 100 == 0:
-        print(i)
-    i += 1
-
-    if not row or len(row) != 4:
-        continue
-
-    pubid, year, word, clue = row
-
-    if pubid == "pubid":
-        continue
-
-    # If we don't have a word, then why bother?
-    if not word:
-        continue
-
-    fmt_clue = clue.strip().replace(".", "")
-    year = int(year)
-
-    # Create the word if it doesn't exist already
-    word_entry = xd_model.XdWord.get(word=word)
-    if not word_entry:
-        word_entry = xd_model.XdWord(word=word)
-
-    # Only add a usage entry if we have a clue
-    if not fmt_clue:
-        continue
-
-    word_usage_info = dict(word=word_entry, clue=fmt_clue)
-
-    if pubid:
-        # Create the year/publisher if they don't exist
-        pubid_entry = xd_model.XdPubId.get(pubid=pubid)
-        if not pubid_entry:
-            pubid_entry = xd_model.XdPubId(pubid=pubid)
-        word_usage_info['pubid'] = pubid_entry
-
-    if year:
-        year_entry = xd_model.XdYear.get(year=year)
-        if not year_entry:
-            year_entry = xd_model.XdYear(year=year)
-        word_usage_info['year'] = year_entry
-
-    # Create a new word entry if the clue is new
-    try:
-        word_usage_entry = xd_model.XdWordUsage.get(**word_usage_info)
-    except:
-        print(word_usage_info)
-        raise
-    if not word_usage_entry:
-        xd_model.XdWordUsage(**word_usage_info)
-
-    xd_model.orm.commit()
+parse_xd(xd_path)
@@ -5,14 +5,20 @@
 import csv
 import logging
 import pathlib
+import time
+from typing import Iterable, Sequence
 
 # Third-party imports
 import numpy as np
+from pony import orm
 
 # Local imports
 
 logger = logging.getLogger(__name__)
 
+# Rows per transaction for bulk ingestion
+BATCH_SIZE = 100_000
+
 
 def read_csv_generator(path: pathlib.Path, delimiter: str, **kwargs):
     with open(path, "r") as file:
@@ -20,3 +26,74 @@ def read_csv_generator(path: pathlib.Path, delimiter: str, **kwargs):
 
         for row in reader:
             yield row
+
+
+def read_csv_batches(path: pathlib.Path, delimiter: str, batch_size: int = BATCH_SIZE, **kwargs):
+    """ Stream a CSV/TSV file in lists of (at most) batch_size rows
+    """
+    batch = []
+    for row in read_csv_generator(path, delimiter, **kwargs):
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk_insert(entity, columns: Sequence[str], rows: Iterable[Sequence], update: bool = False) -> int:
+    """ Insert rows into the table of a pony entity with a single executemany (within the current db_session)
+
+    Rows whose key already exists are skipped, or, with update=True, have any changed columns overwritten, so that
+    ingestion can safely be re-run.
+
+    Args:
+        entity: pony entity class (its database must be bound)
+        columns: attribute names, in the order of the values in each row
+        rows: rows of values
+        update: overwrite the non-key columns of existing rows
+
+    Returns:
+        Number of rows inserted or changed
+    """
+    names = [entity._adict_[c].columns[0] for c in columns]
+    sql = f"INSERT INTO \"{entity._table_}\" ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+    if update:
+        key = list(entity._pk_columns_)
+        values = [n for n in names if n not in key]
+        sql += (f" ON CONFLICT ({', '.join(key)}) DO UPDATE SET {', '.join(f'{n} = excluded.{n}' for n in values)}"
+                f" WHERE ({', '.join(values)}) IS NOT ({', '.join(f'excluded.{n}' for n in values)})")
+    else:
+        sql += " ON CONFLICT DO NOTHING"
+
+    connection = entity._database_.get_connection()
+    n_changes = connection.total_changes
+    connection.executemany(sql, rows)
+    return connection.total_changes - n_changes
+
+
+def select_keys(entity, column: str) -> set:
+    """ All values of a column of a pony entity's table (e.g. to seed an in-memory dedup set)
+    """
+    with orm.db_session:
+        return {row[0] for row in entity._database_.get_connection().execute(
+            f"SELECT {entity._adict_[column].columns[0]} FROM \"{entity._table_}\"")}
+
+
+class IngestProgress(object):
+    """ Logs the number of rows processed (and the rate) after every batch
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.n_rows = 0
+        self.counts = {}
+        self.start_time = time.time()
+
+    def update(self, n_rows: int, **counts):
+        self.n_rows += n_rows
+        for k, n in counts.items():
+            self.counts[k] = self.counts.get(k, 0) + n
+        elapsed = time.time() - self.start_time
+        logger.info(f"{self.name}: {self.n_rows} rows in {elapsed:.1f} s ({self.n_rows / max(elapsed, 1e-9):.0f} rows/s) "
+                    + ", ".join(f"{k}={n}" for k, n in self.counts.items()))
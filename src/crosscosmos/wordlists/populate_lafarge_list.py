@@ -1,14 +1,23 @@
 """ Populate the LaFarge wordlist model from existing sources
+
+Every source database is attached to the LaFarge database, and merged with a single set-based
+INSERT ... SELECT ... ON CONFLICT upsert (keyed on the upper-cased word), all in one transaction. Re-running the merge
+refreshes the scores/links and leaves the source lists and clues as they are.
 """
 
 # Standard library imports
 import logging
+from pathlib import Path
+import sqlite3
+import time
+from typing import Dict
 
 # Third-party imports
-import pony.orm
 
 # Local imports
 from crosscosmos.data_models import (
+    WRITE_PRAGMAS,
+    apply_pragmas,
     collab_word_list_model,
     diehl_model,
     lafarge_model,
@@ -18,80 +27,120 @@ from crosscosmos.data_models import (
 
 logger = logging.getLogger("populate_laf_db")
 
-
-# Iterate through each list and populate the database
-
-
-def update_from(db, src_name: str, update_fn) -> None:
-    logger.info(f"updating from {src_name}")
-    words = db.select()
-    n_rows = words.count()
-    i = 0
-    for w in db.select():
-
-        if i % 2000 == 0:
-            logger.info(f"{i/n_rows * 100:.2f}%")
-
-        i += 1
-
-        if isinstance(w.word, str):
-            word_str = w.word
-        else:
-            word_str = w.word.word
-        uppercase_word = word_str.upper().strip()
-        laf_word = lafarge_model.LaFargeWord.get(word=uppercase_word)
-        if laf_word:
-            if laf_word.sources:
-                if src_name not in laf_word.sources:
-                    laf_word.sources.append(src_name)
-            else:
-                laf_word.sources = [src_name]
-        else:
-            laf_word = lafarge_model.LaFargeWord(word=uppercase_word, sources=[src_name])
-
-        update_fn(laf_word, w)
-
-    lafarge_model.orm.commit()
-
-def collab_word_list_update_fn(laf_word: lafarge_model.LaFargeWord, db_word: collab_word_list_model.CollabWordListWord):
-    laf_word.collab_score = db_word.score
-
-
-def diehl_update_fn(laf_word: lafarge_model.LaFargeWord, db_word: diehl_model.DiehlWord):
-    laf_word.diehl_score = db_word.score
-
-
-def xword_tracker_update_fn(laf_word: lafarge_model.LaFargeWord, db_word: xword_tracker_model.XwordWord):
-    laf_word.xword_link = db_word.info
-
-
-def xd_update_fn(laf_word: lafarge_model.LaFargeWord, db_word: xd_model.XdWord):
-    # Get all xd clues associated with this entry
-    xd_usages = xd_model.XdWordUsage.select(lambda xdw: xdw.word == db_word)
-
-    # Populate the LaFargeClue table from the xd clues
-    for xd_usage in xd_usages:
-        laf_clue = lafarge_model.LaFargeClue.get(word=laf_word, clue=xd_usage.clue)
-        if not laf_clue:
-            lafarge_model.LaFargeClue(clue=db_word.clue,
-                                      source=db_word.pubid.pubid,
-                                      year=db_word.year.year,
-                                      word=laf_word)
-
-
-update_from(db=collab_word_list_model.CollabWordListWord,
-            src_name="collab_word_list",
-            update_fn=collab_word_list_update_fn)
-
-update_from(db=diehl_model.DiehlWord,
-            src_name="diehl",
-            update_fn=diehl_update_fn)
-
-update_from(db=xword_tracker_model.XwordWord,
-            src_name="xword_tracker",
-            update_fn=xword_tracker_update_fn)
-
-lafarge_model.orm.commit()
-# update_from(db=xd_model.xd_word_db,
-#             src_name="xd",
-#             update_fn=xd_update_fn)
+for model in [collab_word_list_model, diehl_model, lafarge_model, xd_model, xword_tracker_model]:
+    model.bind(pragmas=WRITE_PRAGMAS)
+
+LAFARGE_WORD_TABLE = lafarge_model.LaFargeWord._table_
+LAFARGE_CLUE_TABLE = lafarge_model.LaFargeClue._table_
+
+# Required LaFargeWord text columns that a source may not provide
+WORD_DEFAULTS = {"xword_link": "''", "notes": "''"}
+
+
+def attach(connection: sqlite3.Connection, alias: str, db_path: Path, table: str) -> bool:
+    """ Attach a source database, if it exists and has the given table
+    """
+    if not Path(db_path).exists():
+        logger.warning(f"Skipping {alias}: {db_path} does not exist")
+        return False
+
+    connection.execute("ATTACH DATABASE ? AS " + alias, (str(db_path),))
+    if not connection.execute(f"SELECT 1 FROM {alias}.sqlite_master WHERE type = 'table' AND name = ?",
+                              (table,)).fetchone():
+        logger.warning(f"Skipping {alias}: {db_path} has no {table} table")
+        connection.execute("DETACH DATABASE " + alias)
+        return False
+    return True
+
+
+def merge_words(connection: sqlite3.Connection, src_name: str, alias: str, table: str, values: Dict[str, str]) -> int:
+    """ Upsert every word of a source table into LaFargeWord, adding src_name to its sources
+
+    Args:
+        connection: connection to the LaFarge database, with the source attached
+        src_name: source name (as listed in LaFargeWord.sources)
+        alias: schema name the source database is attached as
+        table: source table (with a "word" column)
+        values: LaFargeWord column -> SQL expression over the source row (aliased s) to set it to
+
+    Returns:
+        Number of LaFarge words inserted or updated
+    """
+    columns = {"word": "UPPER(TRIM(s.word))", "length": "LENGTH(TRIM(s.word))", "sources": "json_array(:source)",
+               **WORD_DEFAULTS, **values}
+    updates = [f"{c} = excluded.{c}" for c in values]
+    updates.append(f"""sources = CASE
+            WHEN EXISTS (SELECT 1 FROM json_each({LAFARGE_WORD_TABLE}.sources) WHERE json_each.value = :source)
+            THEN {LAFARGE_WORD_TABLE}.sources
+            ELSE json_insert(COALESCE({LAFARGE_WORD_TABLE}.sources, '[]'), '$[#]', :source)
+        END""")
+
+    n_changes = connection.total_changes
+    connection.execute(f"""
+        INSERT INTO {LAFARGE_WORD_TABLE} ({', '.join(columns)})
+        SELECT {', '.join(columns.values())} FROM {alias}."{table}" AS s WHERE TRIM(s.word) != ''
+        ON CONFLICT (word) DO UPDATE SET {', '.join(updates)}
+    """, dict(source=src_name))
+    return connection.total_changes - n_changes
+
+
+def merge_xd_clues(connection: sqlite3.Connection, alias: str) -> int:
+    """ Add the xd clues of every LaFarge word (each (word, clue) pair once, from its earliest usage)
+
+    Returns:
+        Number of clues added
+    """
+    n_changes = connection.total_changes
+    connection.execute(f"""
+        INSERT INTO {LAFARGE_CLUE_TABLE} (clue, source, year, word)
+        SELECT u.clue, u.pubid, MIN(u.year), UPPER(TRIM(u.word))
+        FROM {alias}."{xd_model.XdWordUsage._table_}" AS u
+        WHERE UPPER(TRIM(u.word)) IN (SELECT word FROM {LAFARGE_WORD_TABLE})
+          AND NOT EXISTS (SELECT 1 FROM {LAFARGE_CLUE_TABLE} AS c
+                          WHERE c.word = UPPER(TRIM(u.word)) AND c.clue = u.clue)
+        GROUP BY UPPER(TRIM(u.word)), u.clue
+    """)
+    return connection.total_changes - n_changes
+
+
+# Sources, in merge order: (name, attached alias, database path, word table, LaFargeWord column -> source expression)
+SOURCES = [
+    ("collab_word_list", "collab", collab_word_list_model.collab_word_list_db_path,
+     collab_word_list_model.CollabWordListWord._table_, {"collab_score": "s.score"}),
+    ("diehl", "diehl", diehl_model.diehl_db_path,
+     diehl_model.DiehlWord._table_, {"diehl_score": "s.score"}),
+    ("xword_tracker", "xword", xword_tracker_model.xword_tracker_db_path,
+     xword_tracker_model.XwordWord._table_, {"xword_link": "s.info"}),
+    ("xd", "xd", xd_model.xd_word_db_path,
+     xd_model.XdWord._table_, {}),
+]
+
+
+def populate(db_path: Path = lafarge_model.lafarge_db_path):
+    """ Merge every available source into the LaFarge database in one transaction, logging per-source throughput
+    """
+    connection = sqlite3.connect(db_path)
+    apply_pragmas(connection, WRITE_PRAGMAS)
+    try:
+        sources = [s for s in SOURCES if attach(connection, s[1], s[2], s[3])]
+
+        with connection:
+            for src_name, alias, _, table, values in sources:
+                logger.info(f"updating from {src_name}")
+                start_time = time.time()
+                n_rows = connection.execute(f'SELECT COUNT(*) FROM {alias}."{table}"').fetchone()[0]
+                n_changed = merge_words(connection, src_name, alias, table, values)
+                if src_name == "xd":
+                    n_changed += merge_xd_clues(connection, alias)
+
+                elapsed = time.time() - start_time
+                logger.info(f"{src_name}: {n_rows} rows, {n_changed} changes in {elapsed:.2f} s "
+                            f"({n_rows / max(elapsed, 1e-9):.0f} rows/s)")
+
+        for _, alias, *_ in sources:
+            connection.execute("DETACH DATABASE " + alias)
+    finally:
+        connection.close()
+
+
+populate()
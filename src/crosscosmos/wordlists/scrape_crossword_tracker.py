@@ -14,10 +14,12 @@ from tqdm import tqdm
 
 # Local imports
 import crosscosmos as xc
-from crosscosmos.data_models import xword_tracker_model
+from crosscosmos.data_models import WRITE_PRAGMAS, xword_tracker_model
+from crosscosmos.wordlists import parsing_utils
 
 logger = logging.getLogger(__name__)
 
+xword_tracker_model.bind(pragmas=WRITE_PRAGMAS)
 
 BASE_URL = "https://crosswordtracker.com"
 word_bank = []
@@ -43,6 +45,10 @@ for i in range(26):
 
         letter_i_box = letter_i_soup.find('div', class_="browse_box")
         words = letter_i_box.find_all('li')
-        for w in words:
-            word = xword_tracker_model.XwordWord(word=w.text, info=BASE_URL+w.a['href'])
-            xword_tracker_model.orm.commit()
\ No newline at end of file
+
+        # One transaction per page (re-scraping updates the links of words already present)
+        with xword_tracker_model.orm.db_session:
+            parsing_utils.bulk_insert(xword_tracker_model.XwordWord,
+                                      ("word", "info", "length"),
+                                      [(w.text, BASE_URL + w.a['href'], len(w.text)) for w in words],
+                                      update=True)